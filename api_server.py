@@ -0,0 +1,392 @@
+# api_server.py
+"""HTTP/JSON-сервис каталога для кассовых терминалов магазинов.
+
+Сервер на asyncio без внешних зависимостей (HTTP/1.1 с keep-alive).
+Чтение выполняется в пуле потоков на соединениях только для чтения из
+connection.ConnectionPool (не больше --readers одновременно). Все записи
+идут через одну очередь: пишущая задача забирает из неё всё накопившееся
+(до WRITE_BATCH запросов) и применяет одной транзакцией на единственном
+пишущем соединении; каждый запрос внутри пачки - свой SAVEPOINT, поэтому
+ошибка одного не откатывает остальные.
+
+Ответы GET содержат ETag (хеш тела); запрос с совпадающим If-None-Match
+получает 304 без тела.
+
+    GET  /books?after=ID&limit=N             книги по порядку id
+    GET  /books/search?q=ТЕКСТ&offset=&limit= полнотекстовый поиск
+    GET  /books/НАЗВАНИЕ                     одна книга
+    GET  /stores?after=ID&limit=N            магазины
+    GET  /stores/МАГАЗИН/books?after=ID      библиотека магазина
+    GET  /stats                              итоги каталога
+    POST /books      {"title", "author", "genre", "price"}
+    POST /authors, /genres, /stores, /customers  {"name"}
+    POST /stores/МАГАЗИН/books  {"title"}    добавить книгу в магазин
+
+Запуск: python api_server.py [--db books.db] [--host 127.0.0.1] [--port 8080] [--readers 4]
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import connection
+import database
+from logger import logger
+from transactions import transaction
+
+MAX_PAGE = 500
+WRITE_BATCH = 256
+MAX_HEADER = 16 * 1024
+MAX_BODY = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+NAMED_TABLES = {
+    "authors": database.add_author,
+    "genres": database.add_genre,
+    "stores": database.add_store,
+    "customers": database.add_customer,
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _book(row):
+    book_id, title, author, genre, price = row
+    return {"id": book_id, "title": title, "author": author, "genre": genre, "price": price}
+
+
+def _int_param(query, name, default):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise HttpError(400, f"Параметр {name} должен быть целым числом") from None
+
+
+def _limit(query, default=50):
+    return max(1, min(_int_param(query, "limit", default), MAX_PAGE))
+
+
+def _store_books(conn, name, after, limit):
+    """(название магазина, страница книг) или None для неизвестного магазина"""
+    stored_name = database.get_store(conn, name)
+    if stored_name is None:
+        return None
+    return stored_name, database.get_store_books_page(conn, name, after, limit)
+
+
+def _stats(conn):
+    counts = {table: database.count_rows(conn, table)
+              for table in ("books", "authors", "genres", "stores", "customers")}
+    counts["store_books"] = database.count_store_links(conn)
+    count, total, minimum, maximum, _ = database.get_price_stats(conn)
+    counts["price"] = {"mean": total / count if count else 0.0, "min": minimum, "max": maximum}
+    return counts
+
+
+class CatalogService:
+    """Обработчики запросов поверх пула соединений и очереди записей"""
+
+    def __init__(self, path, readers=4):
+        self.pool = connection.ConnectionPool(path, max_readers=readers)
+        self._read_executor = ThreadPoolExecutor(readers, thread_name_prefix="reader")
+        self._write_executor = ThreadPoolExecutor(1, thread_name_prefix="writer")
+        self._writes = asyncio.Queue()
+        self._writer_task = None
+        self.routes = [
+            ("GET", ("books",), self.list_books),
+            ("GET", ("books", "search"), self.search_books),
+            ("GET", ("books", None), self.get_book),
+            ("GET", ("stores",), self.list_stores),
+            ("GET", ("stores", None, "books"), self.store_books),
+            ("GET", ("stats",), self.stats),
+            ("POST", ("books",), self.add_book),
+            ("POST", ("stores", None, "books"), self.link_book),
+        ] + [("POST", (table,), functools.partial(self.add_named, table)) for table in NAMED_TABLES]
+
+    # Доступ к базе
+
+    async def read(self, func, *args):
+        def run():
+            with self.pool.reader() as conn:
+                return func(conn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, run)
+
+    async def write(self, func, *args):
+        """Запись через общую очередь; результат - после фиксации пачки"""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._write_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((func, args, future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < WRITE_BATCH and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            try:
+                outcomes = await loop.run_in_executor(self._write_executor, self._apply_batch, batch)
+            except Exception as e:
+                # Не удалась фиксация всей пачки
+                outcomes = [(None, e)] * len(batch)
+            for (_, _, future), (result, error) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    def _apply_batch(self, batch):
+        outcomes = []
+        with self.pool.writer() as conn, transaction(conn):
+            for func, args, _ in batch:
+                try:
+                    with transaction(conn):
+                        outcomes.append((func(conn, *args), None))
+                except Exception as e:
+                    outcomes.append((None, e))
+        return outcomes
+
+    def close(self):
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        self._read_executor.shutdown()
+        self._write_executor.shutdown()
+        self.pool.close()
+
+    # Маршруты
+
+    def route(self, method, segments):
+        """(обработчик, параметры пути) для запроса"""
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            if len(pattern) != len(segments):
+                continue
+            params = []
+            for expected, actual in zip(pattern, segments):
+                if expected is None:
+                    params.append(actual)
+                elif expected != actual:
+                    break
+            else:
+                if route_method == method:
+                    return handler, params
+                allowed = True
+        raise HttpError(405 if allowed else 404, "Метод не поддерживается" if allowed else "Не найдено")
+
+    async def list_books(self, query, body):
+        rows = await self.read(database.get_page, "books", _int_param(query, "after", None),
+                               None, _limit(query))
+        return 200, {"items": [_book(row) for row in rows], "next": rows[-1][0] if rows else None}
+
+    async def search_books(self, query, body):
+        text = (query.get("q") or [""])[0].strip()
+        if not text:
+            raise HttpError(400, "Нужен параметр q")
+        offset = max(0, _int_param(query, "offset", 0))
+        total, rows = await self.read(database.search_books, text, _limit(query), offset)
+        # Больше SEARCH_RANK_LIMIT совпадений не считается: total - нижняя граница
+        more = total > database.SEARCH_RANK_LIMIT
+        return 200, {"total": min(total, database.SEARCH_RANK_LIMIT), "more": more,
+                     "items": [_book(row) for row in rows]}
+
+    async def get_book(self, query, body, title):
+        row = await self.read(database.get_book, title)
+        if row is None:
+            raise HttpError(404, "Книга не найдена")
+        return 200, dict(zip(("title", "author", "genre", "price"), row))
+
+    async def list_stores(self, query, body):
+        rows = await self.read(database.get_page, "stores", _int_param(query, "after", None),
+                               None, _limit(query))
+        return 200, {"items": [{"id": store_id, "name": name} for store_id, name in rows],
+                     "next": rows[-1][0] if rows else None}
+
+    async def store_books(self, query, body, name):
+        found = await self.read(_store_books, name, _int_param(query, "after", None), _limit(query))
+        if found is None:
+            raise HttpError(404, "Магазин не найден")
+        stored_name, rows = found
+        return 200, {"store": stored_name,
+                     "items": [{"id": book_id, "title": title, "author": author}
+                               for book_id, title, author in rows],
+                     "next": rows[-1][0] if rows else None}
+
+    async def stats(self, query, body):
+        return 200, await self.read(_stats)
+
+    async def add_book(self, query, body):
+        data = _json_body(body, ("title", "author", "genre", "price"))
+        try:
+            price = float(data["price"])
+        except (TypeError, ValueError):
+            raise HttpError(400, "Некорректная цена") from None
+        _, _, row = await self.write(database.add_book_with_names, str(data["title"]),
+                                     str(data["author"]), str(data["genre"]), price)
+        if row is None:
+            raise HttpError(409, "Книга уже существует")
+        return 201, dict(zip(("title", "author", "genre", "price"), row))
+
+    async def add_named(self, table, query, body):
+        name = str(_json_body(body, ("name",))["name"]).strip()
+        if not name:
+            raise HttpError(400, "Пустое имя")
+        if not await self.write(NAMED_TABLES[table], name):
+            raise HttpError(409, "Запись уже существует")
+        return 201, {"name": name}
+
+    async def link_book(self, query, body, store_name):
+        data = _json_body(body, ("title",))
+        if not await self.write(database.add_book_to_store, store_name, str(data["title"])):
+            raise HttpError(409, "Книга или магазин не найдены, либо книга уже в магазине")
+        return 201, {"store": store_name, "title": data["title"]}
+
+    async def dispatch(self, method, target, headers, body):
+        """(статус, заголовки, тело) ответа на запрос"""
+        url = urlsplit(target)
+        segments = [unquote(part) for part in url.path.strip("/").split("/") if part]
+        query = parse_qs(url.query)
+        try:
+            handler, params = self.route(method, segments)
+            status, payload = await handler(query, body, *params)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.log_error("Ошибка запроса %s %s: %s", method, target, e, operation="api")
+            status, payload = 500, {"error": "Внутренняя ошибка"}
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        response_headers = {"Content-Type": "application/json; charset=utf-8"}
+        if method == "GET" and status == 200:
+            etag = '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+            response_headers["ETag"] = etag
+            response_headers["Cache-Control"] = "no-cache"
+            if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+                return 304, response_headers, b""
+        return status, response_headers, data
+
+
+def _json_body(body, fields):
+    try:
+        data = json.loads(body or b"null")
+    except ValueError:
+        raise HttpError(400, "Тело запроса должно быть JSON") from None
+    if not isinstance(data, dict) or any(data.get(field) in (None, "") for field in fields):
+        raise HttpError(400, "Нужны поля: " + ", ".join(fields))
+    return data
+
+
+async def handle_connection(service, reader, writer):
+    """Последовательная обработка запросов одного соединения (keep-alive)"""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError:
+                writer.write(_response(431, {}, b"", False))
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length < 0:
+                    raise ValueError(f"отрицательная длина тела: {length}")
+            except ValueError:
+                writer.write(_response(400, {}, b"", False))
+                break
+            if length > MAX_BODY:
+                writer.write(_response(413, {}, b"", False))
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            keep_alive = (version == "HTTP/1.1"
+                          and headers.get("connection", "").lower() != "close")
+            status, response_headers, data = await service.dispatch(method, target, headers, body)
+            writer.write(_response(status, response_headers, data, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def _response(status, headers, data, keep_alive):
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+             f"Content-Length: {len(data)}",
+             "Connection: " + ("keep-alive" if keep_alive else "close")]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data
+
+
+async def serve(path, host, port, readers):
+    conn = connection.connect(path)
+    database.create_tables(conn)
+    conn.close()
+
+    service = CatalogService(path, readers)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer),
+        host, port, limit=MAX_HEADER)
+    # Остановка по SIGTERM/SIGINT: новые соединения не принимаются, пул закрывается
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, server.close)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: остаётся KeyboardInterrupt
+    logger.log_info("API каталога слушает %s:%s", host, port)
+    print(f"API каталога: http://{host}:{port}/", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        service.close()
+        logger.log_info("API каталога остановлен")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON API каталога книг")
+    parser.add_argument("--db", default=connection.DB_PATH, help="файл базы данных")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=4,
+                        help="число соединений и потоков для чтения")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
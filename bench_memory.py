@@ -0,0 +1,92 @@
+# bench_memory.py
+"""Замер памяти на одну книгу: старые объекты против __slots__ и общих авторов/жанров.
+
+Для каждого размера создаётся временная база с N книгами (500 авторов,
+30 жанров), строки читаются курсором, как при загрузке каталога, и из них
+строятся объекты двумя способами:
+
+  до    - классы с __dict__, новые Author/Genre для каждой книги
+  после - классы из classes.py (__slots__) и пулы classes.authors/genres
+
+Память считается через tracemalloc и делится на число книг.
+
+Запуск: python bench_memory.py [100000 1000000]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+import classes
+
+AUTHORS = 500
+GENRES = 30
+
+
+class _LegacyEntity:
+    def __init__(self, name):
+        self.name = name
+
+
+class _LegacyBook(_LegacyEntity):
+    def __init__(self, title, author, genre, price):
+        super().__init__(title)
+        self.author = author
+        self.genre = genre
+        self.price = price
+
+
+def _legacy_books(rows):
+    return [_LegacyBook(title, _LegacyEntity(author), _LegacyEntity(genre), price)
+            for title, author, genre, price in rows]
+
+
+def _compact_books(rows):
+    authors = classes.EntityPool(classes.Author)
+    genres = classes.EntityPool(classes.Genre)
+    return [classes.Book(title, authors.get(author), genres.get(genre), price)
+            for title, author, genre, price in rows], authors, genres
+
+
+def _make_db(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (title TEXT, author TEXT, genre TEXT, price REAL)")
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?)", (
+        (f"Книга номер {i}", f"Автор Фамилия {i % AUTHORS}", f"Жанр {i % GENRES}", float(i % 5000))
+        for i in range(count)))
+    conn.commit()
+    return conn
+
+
+def _measure(conn, build):
+    tracemalloc.start()
+    rows = conn.execute("SELECT title, author, genre, price FROM books")
+    result = build(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def run(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = _make_db(os.path.join(tmp, "bench.db"), count)
+        try:
+            before = _measure(conn, _legacy_books)
+            after = _measure(conn, _compact_books)
+        finally:
+            conn.close()
+    return before / count, after / count
+
+
+def main(argv=None):
+    sizes = [int(arg) for arg in (sys.argv[1:] if argv is None else argv)] or [100_000, 1_000_000]
+    print(f"{'книг':>10} {'до, байт/книга':>16} {'после, байт/книга':>19} {'экономия':>9}")
+    for count in sizes:
+        before, after = run(count)
+        print(f"{count:>10} {before:>16.1f} {after:>19.1f} {1 - after / before:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
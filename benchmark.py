@@ -0,0 +1,210 @@
+# benchmark.py
+"""Набор замеров производительности на синтетических каталогах.
+
+Для каждого масштаба (см. generate_catalog.SCALES) база генерируется один
+раз и кэшируется в --data-dir. Замеряются выборки database.get_all_books
+и get_store_books, загрузка окна (load_data) и обновление блоков
+(update_info_blocks) на платформе Qt offscreen, а также пути массовой
+вставки: importer.bulk_import и поштучный database.add_book.
+
+Результаты пишутся в JSON (--output) вместе с коммитом git и версиями
+Python и SQLite; --compare старый.json печатает изменение медиан.
+
+Запуск: python benchmark.py [--scales 10k 100k] [--repeat 5] [--output benchmark_results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import connection
+import database
+import generate_catalog
+import importer
+
+
+def _timings(func, repeat):
+    """Медиана, минимум и среднее по repeat запускам, в мс"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "runs": repeat,
+    }
+
+
+def prepare_database(data_dir, scale):
+    path = os.path.join(data_dir, f"catalog_{scale}.db")
+    if not os.path.exists(path):
+        print(f"Генерация базы {scale}...", file=sys.stderr)
+        generate_catalog.generate(path, **generate_catalog.SCALES[scale])
+    else:
+        # База из кэша могла быть создана до последних миграций
+        conn = connection.connect(path)
+        database.create_tables(conn)
+        conn.close()
+    return path
+
+
+def bench_queries(path, repeat):
+    conn = connection.connect(path)
+    try:
+        store_names = database.get_all_stores(conn)
+        sample = random.Random(1).sample(store_names, min(50, len(store_names)))
+        return {
+            "database.get_all_books": _timings(lambda: database.get_all_books(conn), repeat),
+            "database.get_store_books x50": _timings(
+                lambda: [database.get_store_books(conn, name) for name in sample], repeat),
+        }
+    finally:
+        conn.close()
+
+
+def bench_window(path, repeat):
+    """load_data и update_info_blocks главного окна на платформе offscreen"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from main import BookStoreApp
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = BookStoreApp(path)
+    window.worker.wait_for_done()
+    try:
+        results = {"app.load_data": _timings(window.load_data, repeat)}
+        for category in ("books", "authors", "genres", "stores", "customers"):
+            window.show_category(category)
+            results[f"app.update_info_blocks[{category}]"] = _timings(
+                window.update_info_blocks, repeat)
+
+        def page_through():
+            window.current_index = 0
+            for _ in range(20):
+                window.navigate_blocks(5, 5)
+                window.flush_render()  # как кадр, отрисованный после каждого нажатия
+        window.show_category("books")
+        results["app.navigate_blocks x20"] = _timings(page_through, repeat)
+        return results
+    finally:
+        window.close()
+        app.processEvents()
+
+
+def _records(count, offset):
+    for i in range(offset, offset + count):
+        yield {"title": f"Импортированная книга {i}", "author": f"Автор импорта {i % 300}",
+               "genre": f"Жанр импорта {i % 20}", "price": 100 + i % 900,
+               "store": f"Книжный №{i % 50 + 1} на Ленина"}
+
+
+def bench_inserts(path, data_dir, repeat, rows):
+    """Вставка в копию базы: пачками через importer и по одной книге"""
+    scratch = os.path.join(data_dir, "scratch.db")
+    generate_catalog.remove_database(scratch)
+    shutil.copyfile(path, scratch)
+    conn = connection.connect(scratch)
+    offset = 0
+
+    def bulk():
+        nonlocal offset
+        importer.bulk_import(conn, _records(rows, offset))
+        offset += rows
+
+    def single():
+        nonlocal offset
+        for record in _records(rows // 10, offset):
+            database.add_book(conn, record["title"], record["author"], record["genre"],
+                              record["price"])
+        offset += rows // 10
+
+    try:
+        return {
+            f"importer.bulk_import x{rows}": _timings(bulk, repeat),
+            f"database.add_book x{rows // 10}": _timings(single, repeat),
+        }
+    finally:
+        conn.close()
+        generate_catalog.remove_database(scratch)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, repeat, data_dir, insert_rows, window=True):
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "scales": {},
+    }
+    for scale in scales:
+        path = prepare_database(data_dir, scale)
+        scale_results = bench_queries(path, repeat)
+        if window:
+            scale_results.update(bench_window(path, repeat))
+        scale_results.update(bench_inserts(path, data_dir, repeat, insert_rows))
+        results["scales"][scale] = scale_results
+    return results
+
+
+def print_results(results, baseline=None):
+    for scale, benches in results["scales"].items():
+        print(f"Масштаб {scale}:")
+        old = (baseline or {}).get("scales", {}).get(scale, {})
+        for name, timing in benches.items():
+            line = f"  {name:<40} {timing['median_ms']:>11.3f} мс"
+            if name in old and old[name]["median_ms"]:
+                line += f"  {timing['median_ms'] / old[name]['median_ms'] - 1:+8.1%}"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности каталога")
+    parser.add_argument("--scales", nargs="+", choices=sorted(generate_catalog.SCALES),
+                        default=["10k"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--insert-rows", type=int, default=5000,
+                        help="число записей в замере массовой вставки")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "bookstore_bench"),
+                        help="каталог для сгенерированных баз")
+    parser.add_argument("--no-window", action="store_true", help="без замеров окна Qt")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = run(args.scales, args.repeat, args.data_dir, args.insert_rows,
+                  window=not args.no_window)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import math
+import weakref
+from collections import Counter, defaultdict
+
+import database
+import classes
+from classes import Book, Store
+
+
+class AggregateIndex:
+    """Число книг и состав жанров/авторов для каждого автора и жанра.
+
+    Строится одним GROUP BY при загрузке и дальше обновляется за O(1)
+    при добавлении и удалении книг.
+    """
+
+    def __init__(self):
+        self.author_genres = defaultdict(Counter)  # автор -> жанр -> число книг
+        self.genre_authors = defaultdict(Counter)  # жанр -> автор -> число книг
+        self.author_counts = Counter()
+        self.genre_counts = Counter()
+
+    def load(self, rows):
+        for author, genre, count in rows:
+            self.add(author, genre, count)
+
+    def add(self, author, genre, count=1):
+        self.author_genres[author][genre] += count
+        self.genre_authors[genre][author] += count
+        self.author_counts[author] += count
+        self.genre_counts[genre] += count
+
+    def remove(self, author, genre, count=1):
+        self._decrement(self.author_genres, author, genre, count)
+        self._decrement(self.genre_authors, genre, author, count)
+        self._decrement_counter(self.author_counts, author, count)
+        self._decrement_counter(self.genre_counts, genre, count)
+
+    def rename_author(self, old, new):
+        self._rename(self.author_genres, self.genre_authors, self.author_counts, old, new)
+
+    def rename_genre(self, old, new):
+        self._rename(self.genre_authors, self.author_genres, self.genre_counts, old, new)
+
+    def author_summary(self, name):
+        """(число книг, список жанров) автора"""
+        return self.author_counts.get(name, 0), list(self.author_genres.get(name, ()))
+
+    def genre_summary(self, name):
+        """(число книг, список авторов) жанра"""
+        return self.genre_counts.get(name, 0), list(self.genre_authors.get(name, ()))
+
+    @staticmethod
+    def _rename(index, reverse, counts, old, new):
+        """Перенос счётчиков с имени old на new в index и обратном индексе reverse"""
+        members = index.pop(old, None)
+        if not members:
+            return
+        index[new].update(members)
+        for member, count in members.items():
+            reverse[member][new] += reverse[member].pop(old, 0)
+        counts[new] += counts.pop(old, 0)
+
+    @staticmethod
+    def _decrement(index, key, member, count):
+        counter = index.get(key)
+        if counter is None:
+            return
+        AggregateIndex._decrement_counter(counter, member, count)
+        if not counter:
+            del index[key]
+
+    @staticmethod
+    def _decrement_counter(counter, key, count):
+        counter[key] -= count
+        if counter[key] <= 0:
+            del counter[key]
+
+
+class RunningStats:
+    """Накопитель статистики цен: количество, сумма, минимум, максимум, сумма квадратов.
+
+    Удаление текущего минимума или максимума помечает границы устаревшими;
+    они перечитываются из базы при следующем обращении.
+    """
+
+    def __init__(self, count=0, total=0.0, minimum=None, maximum=None, total_squares=0.0):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total_squares = total_squares
+        self.bounds_stale = False
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def remove(self, value):
+        self.count -= 1
+        self.total -= value
+        self.total_squares -= value * value
+        if self.count <= 0:
+            self.count, self.total, self.total_squares = 0, 0.0, 0.0
+            self.minimum = self.maximum = None
+        elif value == self.minimum or value == self.maximum:
+            self.bounds_stale = True
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    @property
+    def stddev(self):
+        if not self.count:
+            return 0
+        variance = self.total_squares / self.count - self.mean ** 2
+        return math.sqrt(max(variance, 0))
+
+
+class Catalog:
+    """Реестр объектов каталога с хеш-индексами по названиям.
+
+    Индексы хранят слабые ссылки: в памяти остаются только объекты, которые
+    где-то используются (окна постраничных источников, библиотеки магазинов).
+    Если объекта нет в индексе, он один раз читается из базы по первичному
+    ключу и регистрируется.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.books_by_title = weakref.WeakValueDictionary()
+        self.authors_by_name = classes.authors  # общие пулы авторов и жанров
+        self.genres_by_name = classes.genres
+        self.stores_by_name = weakref.WeakValueDictionary()
+        self.aggregates = AggregateIndex()
+        self.prices = RunningStats()
+        self.store_links = 0
+
+    @staticmethod
+    def read_totals(conn):
+        """Данные для load(): индекс агрегатов автор/жанр, статистика цен и число связей.
+
+        Не трогает объекты каталога, поэтому может выполняться в фоновом
+        потоке на отдельном соединении; там же строится и AggregateIndex,
+        на большом каталоге это сотни тысяч строк.
+        """
+        aggregates = AggregateIndex()
+        aggregates.load(database.get_author_genre_counts(conn))
+        return (aggregates, RunningStats(*database.get_price_stats(conn)),
+                database.count_store_links(conn))
+
+    def load(self, totals=None):
+        """Построение агрегатов и итогов по всей базе (по одному запросу).
+
+        totals - результат read_totals(), если он уже прочитан заранее.
+        """
+        self.aggregates, self.prices, self.store_links = totals or self.read_totals(self.conn)
+
+    def price_stats(self):
+        """Статистика цен; границы перечитываются, только если удалили крайнее значение"""
+        if self.prices.bounds_stale:
+            self.prices.minimum, self.prices.maximum = database.get_price_bounds(self.conn)
+            self.prices.bounds_stale = False
+        return self.prices
+
+    def author(self, name):
+        return self.authors_by_name.get(name)
+
+    def genre(self, name):
+        return self.genres_by_name.get(name)
+
+    def book_from_row(self, row):
+        """Книга из строки (title, author, genre, price) без повторного создания"""
+        title, author_name, genre_name, price = row
+        book = self.books_by_title.get(title)
+        if book is None:
+            book = Book(title, self.author(author_name), self.genre(genre_name), price)
+            self.books_by_title[title] = book
+        return book
+
+    def stores_from_rows(self, rows):
+        """Магазины страницы вместе с библиотеками.
+
+        Библиотеки всех ещё не загруженных магазинов читаются одним запросом.
+        """
+        names = [row[0] for row in rows]
+        stores = {name: self.stores_by_name.get(name) for name in names}
+        missing = [name for name, store in stores.items() if store is None]
+        if missing:
+            libraries = database.get_store_books_batch(self.conn, missing)
+            for name in missing:
+                store = Store(name)
+                store.load_library(self.book_from_row(book_row) for book_row in libraries[name])
+                self.stores_by_name[name] = stores[name] = store
+        return [stores[name] for name in names]
+
+    def get_book(self, title):
+        book = self.books_by_title.get(title)
+        if book is None:
+            row = database.get_book(self.conn, title)
+            if row:
+                book = self.book_from_row(row)
+        return book
+
+    def get_store(self, name):
+        store = self.stores_by_name.get(name)
+        if store is None:
+            # В базе название ищется без учёта регистра; реестр ведётся по точному
+            stored_name = database.get_store(self.conn, name)
+            if stored_name is not None:
+                store = self.stores_from_rows([(stored_name,)])[0]
+        return store
+
+    def apply_changes(self, changes):
+        """Применение строк журнала изменений (changes.ChangeFeed.poll).
+
+        changes - последовательность (таблица, операция, old, new), где old и
+        new - словари значений строки до и после изменения. Агрегаты и
+        статистика цен обновляются по разнице, закэшированные книги и
+        магазины с устаревшими данными вычеркиваются из реестра и при
+        следующем обращении читаются из базы. Возвращает множество
+        категорий интерфейса, списки которых нужно перечитать.
+        """
+        touched = set()
+        for table, op, old, new in changes:
+            if table == "books":
+                touched.add("books")
+                if old is not None:
+                    self._forget_book(old)
+                if new is not None:
+                    self.aggregates.add(new["author"], new["genre"])
+                    if new["price"] is not None:
+                        self.prices.add(new["price"])
+            elif table == "store_books":
+                touched.add("stores")
+                self.store_links += (op == "I") - (op == "D")
+                for row in (old, new):
+                    if row is not None and row["store"] is not None:
+                        self.stores_by_name.pop(row["store"], None)
+            else:
+                touched.add(table)
+                if op == "U" and table in ("authors", "genres"):
+                    rename = (self.aggregates.rename_author if table == "authors"
+                              else self.aggregates.rename_genre)
+                    rename(old["name"], new["name"])
+                    # Книги и библиотеки ссылаются на объект со старым именем
+                    self.books_by_title.clear()
+                    self.stores_by_name.clear()
+                    touched.update(("books", "stores"))
+                elif table == "stores" and old is not None:
+                    self.stores_by_name.pop(old["name"], None)
+        return touched
+
+    def _forget_book(self, row):
+        """Снятие с учёта прежнего состояния книги из журнала изменений"""
+        title = row["title"]
+        self.books_by_title.pop(title, None)
+        self.aggregates.remove(row["author"], row["genre"])
+        if row["price"] is not None:
+            self.prices.remove(row["price"])
+        for name, store in list(self.stores_by_name.items()):
+            if store.has_book(title):
+                del self.stores_by_name[name]
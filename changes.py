@@ -0,0 +1,61 @@
+# changes.py
+"""Чтение журнала изменений change_log (см. migrations.py, миграция 7).
+
+Триггеры записывают в журнал каждое изменение каталога, кто бы его ни
+сделал: это окно, другой экземпляр приложения, cli.py или api_server.py.
+ChangeFeed помнит id последней прочитанной строки и на каждом опросе
+сначала сравнивает PRAGMA data_version: пока другие соединения ничего не
+фиксировали, опрос стоит одного обращения к SQLite без чтения таблиц.
+
+    feed = ChangeFeed(conn, last_id)
+    changes = feed.poll()      # [] - нет изменений, None - нужна полная перезагрузка
+    if changes:
+        catalog.apply_changes(changes)
+"""
+import json
+
+import database
+
+# Больше строк разом дешевле перечитать каталог целиком, чем применять по одной
+RELOAD_THRESHOLD = 5000
+
+
+def _decode(payload):
+    return json.loads(payload) if payload is not None else None
+
+
+class ChangeFeed:
+    """Новые строки журнала изменений для одного соединения"""
+
+    def __init__(self, conn, last_id, reload_threshold=RELOAD_THRESHOLD):
+        self.conn = conn
+        self.last_id = last_id
+        self.reload_threshold = reload_threshold
+        self.data_version = None  # первый опрос всегда читает журнал
+
+    def poll(self):
+        """Изменения после last_id списком (таблица, операция, old, new).
+
+        data_version не меняется от записей через то же соединение, поэтому
+        ChangeFeed стоит держать на соединении, которое само не пишет.
+        Возвращает None, если нужных строк в журнале уже нет (их удалила
+        очистка) или их больше reload_threshold; позиция тогда не
+        сдвигается, новую задаёт reset() после перезагрузки.
+        """
+        version = database.get_data_version(self.conn)
+        if version == self.data_version:
+            return []
+        self.data_version = version
+        first, last = database.get_change_log_bounds(self.conn)
+        if last <= self.last_id:
+            return []
+        if first > self.last_id + 1 or last - self.last_id > self.reload_threshold:
+            return None
+        rows = database.get_changes(self.conn, self.last_id)
+        self.last_id = rows[-1][0]
+        return [(table, op, _decode(old), _decode(new)) for _, table, op, old, new in rows]
+
+    def reset(self, last_id):
+        """Новая позиция после полной перезагрузки каталога"""
+        self.last_id = last_id
+        self.data_version = None
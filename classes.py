@@ -1,6 +1,13 @@
 import sqlite3
+import weakref
+
+from names import normalize_name
+from transactions import commit
 
 class Entity:
+    # __slots__ вместо __dict__ у каждого объекта; __weakref__ нужен реестрам со слабыми ссылками
+    __slots__ = ("name", "__weakref__")
+
     def __init__(self, name):
         self.name = name
 
@@ -12,6 +19,7 @@ class Entity:
 
 
 class Book(Entity):
+    __slots__ = ("author", "genre", "price")
     total_books = 0
 
     def __init__(self, title, author, genre, price):
@@ -40,11 +48,15 @@ class Book(Entity):
 
 
 class Genre(Entity):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
 
 class Author(Entity):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
@@ -53,6 +65,8 @@ class Author(Entity):
 
 
 class Customer(Entity):
+    __slots__ = ("books",)
+
     def __init__(self, name):
         super().__init__(name)
         self.books = []
@@ -62,45 +76,108 @@ class Customer(Entity):
 
 
 class Store(Entity):
+    __slots__ = ("library", "titles")
+
     def __init__(self, name):
         super().__init__(name)
         self.library = []
+        self.titles = set()  # индекс названий книг библиотеки
 
     def __add__(self, book):
         return self.add_book(book)
 
+    def has_book(self, title):
+        return title in self.titles
+
+    def load_library(self, books):
+        self.library = list(books)
+        self.titles = {book.name for book in self.library}
+
     def add_book(self, book):
         self.library.append(book)
+        self.titles.add(book.name)
         print(f"Книга '{book.name}' добавлена в библиотеку магазина '{self.name}'.")
 
     def add_book_with_conn(self, conn, book):
         c = conn.cursor()
-        c.execute("SELECT * FROM books WHERE title = ?", (book.name,))
+        c.execute("SELECT id FROM books WHERE norm_name = ?", (normalize_name(book.name),))
         existing_book = c.fetchone()
         
-        if any(b.name == book.name for b in self.library):
+        if self.has_book(book.name):
             print("Книга с таким названием уже существует в библиотеке.")
             return
         
         print(f"Проверка существования книги '{book.name}' в базе данных...")
         if existing_book is None:
-            c.execute("INSERT INTO books VALUES (?, ?, ?, ?)",
-                      (book.name, book.author.name, book.genre.name, book.price))
-            conn.commit()
+            author_key = normalize_name(book.author.name)
+            genre_key = normalize_name(book.genre.name)
+            c.execute("INSERT OR IGNORE INTO authors (name, norm_name) VALUES (?, ?)",
+                      (book.author.name, author_key))
+            c.execute("INSERT OR IGNORE INTO genres (name, norm_name) VALUES (?, ?)",
+                      (book.genre.name, genre_key))
+            c.execute("""INSERT INTO books (title, norm_name, author_id, genre_id, price)
+                        VALUES (?, ?, (SELECT id FROM authors WHERE norm_name = ?),
+                                (SELECT id FROM genres WHERE norm_name = ?), ?)""",
+                      (book.name, normalize_name(book.name), author_key, genre_key, book.price))
+            commit(conn)
             self.add_book(book)
             print(f"Книга '{book.name}' добавлена в базу данных магазина '{self.name}'.")
         else:
             self.add_book(book)
             print("Книга с таким названием уже существует в базе данных, но добавлена в библиотеку.")
 
+    def discard_book(self, title):
+        if self.has_book(title):
+            self.library = [b for b in self.library if b.name != title]
+            self.titles.discard(title)
+
     def remove_book(self, conn, book_title):
         c = conn.cursor()
-        c.execute("DELETE FROM books WHERE title = ?", (book_title,))
-        self.library = [b for b in self.library if b.name != book_title]
-        conn.commit()
+        # Связи с магазинами удаляются каскадно (ON DELETE CASCADE)
+        c.execute("DELETE FROM books WHERE norm_name = ?", (normalize_name(book_title),))
+        self.discard_book(book_title)
+        commit(conn)
         print(f"Книга '{book_title}' удалена из магазина.")
 
     def show_library(self):
         print(f"Библиотека магазина '{self.name}':")
         for book in self.library:
             print(book)
+
+
+class EntityPool:
+    """Фабрика-приспособленец: для каждого имени существует один общий объект.
+
+    Книги одного автора (жанра) ссылаются на один и тот же объект Author
+    (Genre). Пул хранит слабые ссылки, поэтому объект живёт, пока на него
+    ссылается хотя бы одна книга.
+    """
+    __slots__ = ("cls", "_items")
+
+    def __init__(self, cls):
+        self.cls = cls
+        self._items = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def get(self, name):
+        item = self._items.get(name)
+        if item is None:
+            item = self.cls(name)
+            self._items[name] = item
+        return item
+
+    def add(self, item):
+        """Регистрация готового объекта, если для имени ещё нет общего"""
+        return self._items.setdefault(item.name, item)
+
+    def find(self, name):
+        return self._items.get(name)
+
+
+authors = EntityPool(Author)
+genres = EntityPool(Genre)
@@ -0,0 +1,260 @@
+# cli.py
+"""Командная строка каталога без графического интерфейса.
+
+Работает напрямую с database.py и не импортирует PyQt5, поэтому подходит
+для cron и скриптов: запуск стоит импорта нескольких модулей и одного
+соединения с базой.
+
+    python -m cli add author "Лев Толстой"           # имена можно передать списком
+    python -m cli add store < stores.txt              # без аргументов - по строке из stdin
+    python -m cli add book "Война и мир" "Лев Толстой" "Роман" 990
+    python -m cli link "Книжный на Ленина" "Война и мир"
+    python -m cli remove book "Война и мир"
+    python -m cli list books [--store МАГАЗИН] [--limit N]
+    python -m cli import catalog.csv                  # см. importer.py; '-' - JSONL из stdin
+    python -m cli export [--format csv|jsonl] [--stores]
+    python -m cli stats
+
+Пакетный ввод из stdin: для add book и link поля строки разделяются
+табуляцией; записи применяются транзакциями по BATCH_SIZE строк. Вывод
+list и export идёт потоком по мере чтения базы. Код возврата 1, если
+хотя бы одна запись не применена (дубликат, не найдена, ошибка формата).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+import connection
+import database
+from transactions import transaction
+
+BATCH_SIZE = 1000
+
+ENTITY_TABLES = {
+    "book": "books",
+    "author": "authors",
+    "genre": "genres",
+    "store": "stores",
+    "customer": "customers",
+}
+ADD_NAMED = {
+    "author": database.add_author,
+    "genre": database.add_genre,
+    "store": database.add_store,
+    "customer": database.add_customer,
+}
+EXPORT_FIELDS = ("title", "author", "genre", "price")
+
+
+def _stdin_records(fields):
+    """Строки stdin, разбитые по табуляции; пустые строки пропускаются"""
+    for line in sys.stdin:
+        line = line.rstrip("\n")
+        if line.strip():
+            yield line.split("\t") if fields > 1 else [line.strip()]
+
+
+def _apply(conn, records, action, label):
+    """Применение action(conn, *поля) к записям пачками; число неудач"""
+    failed = 0
+    done = 0
+    records = iter(records)
+    while True:
+        with transaction(conn):
+            for record in records:
+                try:
+                    ok = action(conn, *record)
+                except (TypeError, ValueError, sqlite3.IntegrityError) as e:
+                    print(f"Ошибка {label} {record}: {e}", file=sys.stderr)
+                    ok = False
+                if not ok:
+                    failed += 1
+                done += 1
+                if done % BATCH_SIZE == 0:
+                    break
+            else:
+                break
+    print(f"{label}: обработано {done}, не применено {failed}", file=sys.stderr)
+    return failed
+
+
+def _add_book(conn, title, author, genre, price):
+    return database.add_book(conn, title, author, genre, float(price))
+
+
+def cmd_add(conn, args):
+    if args.entity == "book":
+        records = [args.values] if args.values else _stdin_records(4)
+        return _apply(conn, records, _add_book, "add book")
+    records = [[name] for name in args.values] if args.values else _stdin_records(1)
+    return _apply(conn, records, ADD_NAMED[args.entity], f"add {args.entity}")
+
+
+def cmd_link(conn, args):
+    if args.store and args.book:
+        records = [(args.store, args.book)]
+    elif args.store or args.book:
+        sys.exit("Нужны оба аргумента: магазин и книга (или ни одного для чтения из stdin)")
+    else:
+        records = _stdin_records(2)
+    return _apply(conn, records, database.add_book_to_store, "link")
+
+
+def cmd_remove(conn, args):
+    table = ENTITY_TABLES[args.entity]
+    records = [[name] for name in args.values] if args.values else _stdin_records(1)
+    return _apply(conn, records, lambda conn, name: database.remove_named(conn, table, name),
+                  f"remove {args.entity}")
+
+
+def _iter_pages(conn, table, limit=None):
+    """Строки категории потоком, порциями keyset-пагинации (без ключа)"""
+    after = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = 1000 if remaining is None else min(1000, remaining)
+        rows = database.get_page(conn, table, after=after, limit=size)
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        after = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def _iter_store_books(conn, store_name, limit=None):
+    after = None
+    count = 0
+    while limit is None or count < limit:
+        rows = database.get_store_books_page(conn, store_name, after=after, limit=1000)
+        if not rows:
+            return
+        for row in rows[:None if limit is None else limit - count]:
+            yield row[1:]
+        count += len(rows)
+        after = rows[-1][0]
+
+
+def cmd_list(conn, args):
+    if args.store:
+        rows = _iter_store_books(conn, args.store, args.limit)
+    else:
+        rows = _iter_pages(conn, args.category, args.limit)
+    write = sys.stdout.write
+    for row in rows:
+        write("\t".join(str(value) for value in row) + "\n")
+    return 0
+
+
+def cmd_import(conn, args):
+    import importer
+
+    if args.path == "-":
+        records = importer.parse_json_lines(sys.stdin)
+    else:
+        records = importer.read_records(args.path)
+    stats = importer.bulk_import(conn, records, args.chunk_size)
+    for table in importer.TABLES:
+        print(f"{table}\t{stats[table]['inserted']}\t{stats[table]['skipped']}")
+    print(f"invalid\t{stats['invalid']}")
+    return 1 if stats["invalid"] else 0
+
+
+def cmd_export(conn, args):
+    """Книги (или, с --stores, связи магазин-книга) в формате, который читает importer.py"""
+    fields = EXPORT_FIELDS + ("store",) if args.stores else EXPORT_FIELDS
+    if args.stores:
+        rows = ((*row[1:], row[0]) for row in database.iter_store_links(conn))
+    else:
+        rows = _iter_pages(conn, "books")
+    out = sys.stdout
+    if args.format == "jsonl":
+        import json
+        for row in rows:
+            out.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n")
+    else:
+        import csv
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(fields)
+        writer.writerows(rows)
+    return 0
+
+
+def cmd_stats(conn, args):
+    for table in ("books", "authors", "genres", "stores", "customers"):
+        print(f"{table}\t{database.count_rows(conn, table)}")
+    print(f"store_books\t{database.count_store_links(conn)}")
+    count, total, minimum, maximum, _ = database.get_price_stats(conn)
+    if count:
+        print(f"price_mean\t{total / count:.2f}")
+        print(f"price_min\t{minimum:.2f}")
+        print(f"price_max\t{maximum:.2f}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli",
+                                     description="Операции с каталогом книг без интерфейса")
+    parser.add_argument("--db", default=connection.DB_PATH, help="файл базы данных")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="добавить книги, авторов, жанры, магазины, покупателей")
+    add.add_argument("entity", choices=sorted(ENTITY_TABLES))
+    add.add_argument("values", nargs="*",
+                     help="имена; для book - название, автор, жанр, цена; пусто - из stdin")
+    add.set_defaults(handler=cmd_add)
+
+    link = commands.add_parser("link", help="добавить книгу в магазин")
+    link.add_argument("store", nargs="?")
+    link.add_argument("book", nargs="?")
+    link.set_defaults(handler=cmd_link)
+
+    remove = commands.add_parser("remove", help="удалить запись по имени")
+    remove.add_argument("entity", choices=sorted(ENTITY_TABLES))
+    remove.add_argument("values", nargs="*", help="имена; пусто - из stdin")
+    remove.set_defaults(handler=cmd_remove)
+
+    list_ = commands.add_parser("list", help="вывести записи категории")
+    list_.add_argument("category", choices=sorted(ENTITY_TABLES.values()))
+    list_.add_argument("--store", help="только книги этого магазина (для books)")
+    list_.add_argument("--limit", type=int)
+    list_.set_defaults(handler=cmd_list)
+
+    import_ = commands.add_parser("import", help="массовый импорт .csv/.jsonl (importer.py)")
+    import_.add_argument("path", help="файл или '-' для JSONL из stdin")
+    import_.add_argument("--chunk-size", type=int, default=5000)
+    import_.set_defaults(handler=cmd_import)
+
+    export = commands.add_parser("export", help="выгрузка книг в CSV или JSONL")
+    export.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    export.add_argument("--stores", action="store_true",
+                        help="по строке на каждую связь магазин-книга с полем store")
+    export.set_defaults(handler=cmd_export)
+
+    stats = commands.add_parser("stats", help="число записей и статистика цен")
+    stats.set_defaults(handler=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "list" and args.store and args.category != "books":
+        sys.exit("--store применим только к list books")
+
+    conn = connection.connect(args.db)
+    try:
+        database.create_tables(conn)
+        status = args.handler(conn, args)
+    except BrokenPipeError:
+        # Читатель вывода (например, head) закрыл канал раньше конца данных
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 0
+    finally:
+        conn.close()
+    sys.exit(1 if status else 0)
+
+
+if __name__ == "__main__":
+    main()
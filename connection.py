@@ -0,0 +1,116 @@
+# connection.py
+"""Создание настроенных соединений SQLite и пул соединений.
+
+connect() открывает соединение с набором PRAGMA (WAL, synchronous=NORMAL,
+увеличенный кэш страниц, mmap, временные таблицы в памяти, ожидание
+блокировки, проверка внешних ключей) и увеличенным кэшем подготовленных
+запросов. ConnectionPool выдаёт одно пишущее соединение и несколько
+соединений только для чтения, чтобы фоновые потоки читали базу, не
+дожидаясь соединения интерфейса.
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = "books.db"
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,           # в КиБ (отрицательное значение), около 16 МБ
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,           # мс
+    "foreign_keys": "ON",
+}
+
+# Размер кэша подготовленных запросов sqlite3 (по умолчанию 128)
+STATEMENT_CACHE_SIZE = 512
+
+# Эти PRAGMA меняют файл базы и недоступны соединениям только для чтения
+_WRITE_ONLY_PRAGMAS = {"journal_mode"}
+
+
+def apply_pragmas(conn, pragmas, readonly=False):
+    for name, value in pragmas.items():
+        if value is None or (readonly and name in _WRITE_ONLY_PRAGMAS):
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def connect(path=DB_PATH, readonly=False, check_same_thread=True, **pragmas):
+    """Соединение с применёнными PRAGMA; значения по умолчанию переопределяются аргументами"""
+    settings = dict(DEFAULT_PRAGMAS, **pragmas)
+    if readonly:
+        # pathlib нужен только здесь и заметно удлиняет запуск cli.py
+        from pathlib import Path
+        uri = Path(path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=check_same_thread,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+    apply_pragmas(conn, settings, readonly)
+    return conn
+
+
+class ConnectionPool:
+    """Одно пишущее соединение и до max_readers соединений только для чтения.
+
+    Соединения создаются лениво и могут использоваться из разных потоков,
+    но каждое в один момент времени выдаётся только одному потоку.
+    """
+
+    def __init__(self, path=DB_PATH, max_readers=4, **pragmas):
+        self.path = path
+        self.max_readers = max_readers
+        self.pragmas = pragmas
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._idle_readers = queue.LifoQueue()
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        self._all_readers = []
+
+    @contextmanager
+    def reader(self):
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle_readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = connect(self.path, check_same_thread=False, **self.pragmas)
+            yield self._writer
+
+    def close(self):
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self._readers_created = 0
+            self._idle_readers = queue.LifoQueue()
+
+    def _acquire_reader(self):
+        try:
+            return self._idle_readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if self._readers_created < self.max_readers:
+                conn = connect(self.path, readonly=True, check_same_thread=False, **self.pragmas)
+                self._readers_created += 1
+                self._all_readers.append(conn)
+                return conn
+        return self._idle_readers.get()
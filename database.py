@@ -1,128 +1,368 @@
 # database.py
+import re
 import sqlite3
+from itertools import groupby
 from classes import Book, Author, Genre, Customer, Store
+import connection
+import metrics
+import migrations
+from names import normalize_name
+from transactions import commit, transaction
 
 def create_tables(conn):
-    c = conn.cursor()
-    c.execute("""CREATE TABLE IF NOT EXISTS books (
-                title text PRIMARY KEY,
-                author text,
-                genre text,
-                price real
-                )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS authors (
-                name text PRIMARY KEY
-                )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS genres (
-                name text PRIMARY KEY
-                )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS customers (
-                name text PRIMARY KEY
-                )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS stores (
-                name text PRIMARY KEY
-                )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS store_books (
-                store_name text,
-                book_title text,
-                PRIMARY KEY (store_name, book_title),
-                FOREIGN KEY (store_name) REFERENCES stores(name),
-                FOREIGN KEY (book_title) REFERENCES books(title)
-                )""")
-    conn.commit()
+    """Создание и обновление схемы через миграции (см. migrations.py)"""
+    migrations.migrate(conn)
+
+# Общий фрагмент запросов: книга вместе с именами автора и жанра
+BOOK_COLUMNS = "b.title, a.name, g.name, b.price"
+NAME_JOINS = """LEFT JOIN authors a ON a.id = b.author_id
+                LEFT JOIN genres g ON g.id = b.genre_id"""
+BOOK_JOINS = f"books b {NAME_JOINS}"
 
 def add_book(conn, title, author, genre, price):
+    """Добавление книги; недостающие автор и жанр создаются в той же транзакции.
+
+    Автор и жанр ищутся по нормализованному имени (names.normalize_name),
+    поэтому 'стивен' связывает книгу с уже существующим автором 'Стивен'.
+    Книга с тем же нормализованным названием считается дубликатом.
+    """
+    author_key = normalize_name(author)
+    genre_key = normalize_name(genre)
     try:
-        c = conn.cursor()
-        c.execute("INSERT INTO books VALUES (?, ?, ?, ?)",
-                 (title, author, genre, price))
-        conn.commit()
+        with transaction(conn):
+            c = conn.cursor()
+            c.execute("INSERT OR IGNORE INTO authors (name, norm_name) VALUES (?, ?)",
+                      (author, author_key))
+            c.execute("INSERT OR IGNORE INTO genres (name, norm_name) VALUES (?, ?)",
+                      (genre, genre_key))
+            c.execute("""INSERT INTO books (title, norm_name, author_id, genre_id, price)
+                        VALUES (?, ?, (SELECT id FROM authors WHERE norm_name = ?),
+                                (SELECT id FROM genres WHERE norm_name = ?), ?)""",
+                      (title, normalize_name(title), author_key, genre_key, price))
         return True
     except sqlite3.IntegrityError:
         return False
 
-def add_author(conn, name):
+def add_book_with_names(conn, title, author, genre, price):
+    """Автор, жанр и книга одной транзакцией.
+
+    Существующие автор и жанр просто не добавляются повторно. Возвращает
+    (автор добавлен, жанр добавлен, строка книги как в get_book или None).
+    """
+    with transaction(conn):
+        author_added = add_author(conn, author)
+        genre_added = add_genre(conn, genre)
+        book_added = add_book(conn, title, author, genre, price)
+    return author_added, genre_added, get_book(conn, title) if book_added else None
+
+def _add_named(conn, table, name):
+    """Вставка имени; дубликат с точностью до регистра и ё/е отклоняется индексом norm_name"""
     try:
         c = conn.cursor()
-        c.execute("INSERT INTO authors VALUES (?)", (name,))
-        conn.commit()
+        c.execute(f"INSERT INTO {table} (name, norm_name) VALUES (?, ?)",
+                  (name, normalize_name(name)))
+        commit(conn)
         return True
     except sqlite3.IntegrityError:
         return False
 
+def add_author(conn, name):
+    return _add_named(conn, "authors", name)
+
 def add_genre(conn, name):
-    try:
-        c = conn.cursor()
-        c.execute("INSERT INTO genres VALUES (?)", (name,))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
+    return _add_named(conn, "genres", name)
 
 def add_customer(conn, name):
-    try:
-        c = conn.cursor()
-        c.execute("INSERT INTO customers VALUES (?)", (name,))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
+    return _add_named(conn, "customers", name)
 
 def add_store(conn, name):
-    try:
-        c = conn.cursor()
-        c.execute("INSERT INTO stores VALUES (?)", (name,))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
+    return _add_named(conn, "stores", name)
 
 def add_book_to_store(conn, store_name, book_title):
     try:
         c = conn.cursor()
-        c.execute("INSERT INTO store_books VALUES (?, ?)", 
-                 (store_name, book_title))
-        conn.commit()
+        c.execute("""INSERT INTO store_books (store_id, book_id)
+                    SELECT s.id, b.id FROM stores s, books b
+                    WHERE s.norm_name = ? AND b.norm_name = ?""",
+                 (normalize_name(store_name), normalize_name(book_title)))
+        if c.rowcount != 1:
+            return False
+        commit(conn)
         return True
     except sqlite3.IntegrityError:
         return False
 
+def remove_named(conn, table, name):
+    """Удаление строки по имени (для books - по названию) без учёта регистра и ё/е.
+
+    Возвращает True, если строка была. Связи магазин-книга удаляются
+    каскадно; автора или жанр, на которых ссылаются книги, удалить нельзя
+    (sqlite3.IntegrityError).
+    """
+    c = conn.cursor()
+    c.execute(f"DELETE FROM {table} WHERE norm_name = ?", (normalize_name(name),))
+    commit(conn)
+    return c.rowcount > 0
+
 def get_store_books(conn, store_name):
     c = conn.cursor()
-    c.execute("""SELECT b.title, b.author, b.genre, b.price 
-                FROM books b JOIN store_books sb ON b.title = sb.book_title
-                WHERE sb.store_name = ?""", (store_name,))
+    c.execute(f"""SELECT {BOOK_COLUMNS}
+                FROM stores s
+                JOIN store_books sb ON sb.store_id = s.id
+                JOIN books b ON b.id = sb.book_id {NAME_JOINS}
+                WHERE s.norm_name = ?""", (normalize_name(store_name),))
     return c.fetchall()
 
+def get_store_books_batch(conn, store_names, chunk_size=500):
+    """Библиотеки сразу нескольких магазинов: {название магазина: [строки книг]}
+
+    Один упорядоченный JOIN на каждые chunk_size магазинов; строки читаются
+    потоково и группируются за один проход.
+    """
+    store_names = list(store_names)
+    libraries = {name: [] for name in store_names}
+    for start in range(0, len(store_names), chunk_size):
+        chunk = store_names[start:start + chunk_size]
+        placeholders = ", ".join("?" * len(chunk))
+        c = conn.cursor()
+        c.execute(f"""SELECT s.name, {BOOK_COLUMNS}
+                    FROM stores s
+                    JOIN store_books sb ON sb.store_id = s.id
+                    JOIN books b ON b.id = sb.book_id {NAME_JOINS}
+                    WHERE s.name IN ({placeholders})
+                    ORDER BY s.id""", chunk)
+        for store_name, rows in groupby(c, key=lambda row: row[0]):
+            libraries[store_name] = [row[1:] for row in rows]
+    return libraries
+
+def iter_store_links(conn):
+    """Все связи магазин-книга потоком: строки (магазин, название, автор, жанр, цена)"""
+    c = conn.cursor()
+    c.execute(f"""SELECT s.name, {BOOK_COLUMNS}
+                FROM store_books sb
+                JOIN stores s ON s.id = sb.store_id
+                JOIN books b ON b.id = sb.book_id {NAME_JOINS}
+                ORDER BY sb.store_id, sb.book_id""")
+    yield from c
+
 def get_all_books(conn):
     c = conn.cursor()
-    c.execute("SELECT title, author, genre, price FROM books")
+    c.execute(f"SELECT {BOOK_COLUMNS} FROM {BOOK_JOINS} ORDER BY b.id")
     return c.fetchall()
 
 def get_all_authors(conn):
     c = conn.cursor()
-    c.execute("SELECT name FROM authors")
+    c.execute("SELECT name FROM authors ORDER BY id")
     return [row[0] for row in c.fetchall()]
 
 def get_all_genres(conn):
     c = conn.cursor()
-    c.execute("SELECT name FROM genres")
+    c.execute("SELECT name FROM genres ORDER BY id")
     return [row[0] for row in c.fetchall()]
 
 def get_all_stores(conn):
     c = conn.cursor()
-    c.execute("SELECT name FROM stores")
+    c.execute("SELECT name FROM stores ORDER BY id")
     return [row[0] for row in c.fetchall()]
 
 def get_all_customers(conn):
     c = conn.cursor()
-    c.execute("SELECT name FROM customers")
+    c.execute("SELECT name FROM customers ORDER BY id")
+    return [row[0] for row in c.fetchall()]
+
+# Постраничные выборки категорий: (ключ, столбцы, источник строк)
+PAGE_SOURCES = {
+    "books": ("b.id", BOOK_COLUMNS, BOOK_JOINS),
+    "authors": ("id", "name", "authors"),
+    "genres": ("id", "name", "genres"),
+    "stores": ("id", "name", "stores"),
+    "customers": ("id", "name", "customers"),
+}
+
+def count_rows(conn, table):
+    c = conn.cursor()
+    c.execute(f"SELECT COUNT(*) FROM {table}")
+    return c.fetchone()[0]
+
+def get_page(conn, table, after=None, before=None, limit=20):
+    """Keyset-пагинация по id: строки после ключа after или перед ключом before.
+
+    Каждая строка начинается с ключа (id), за ним идут столбцы из PAGE_SOURCES.
+    """
+    key, columns, source = PAGE_SOURCES[table]
+    c = conn.cursor()
+    if before is not None:
+        c.execute(f"""SELECT {key}, {columns} FROM {source}
+                    WHERE {key} < ? ORDER BY {key} DESC LIMIT ?""", (before, limit))
+        return c.fetchall()[::-1]
+    if after is None:
+        c.execute(f"SELECT {key}, {columns} FROM {source} ORDER BY {key} LIMIT ?", (limit,))
+    else:
+        c.execute(f"""SELECT {key}, {columns} FROM {source}
+                    WHERE {key} > ? ORDER BY {key} LIMIT ?""", (after, limit))
+    return c.fetchall()
+
+def get_page_at(conn, table, offset, limit=20):
+    """Страница по абсолютной позиции (используется только при переходе без опорного ключа)"""
+    if offset <= 0:
+        return get_page(conn, table, limit=limit)
+    key, columns, source = PAGE_SOURCES[table]
+    c = conn.cursor()
+    c.execute(f"SELECT {key}, {columns} FROM {source} ORDER BY {key} LIMIT ? OFFSET ?",
+              (limit, offset))
+    return c.fetchall()
+
+# Слова короче ищутся целиком: префиксные индексы books_fts начинаются
+# с двух символов, а префикс из одной буквы перебирает весь словарь
+MIN_PREFIX_LENGTH = 2
+
+def search_query(text):
+    """Запрос FTS5 из строки поиска: все слова, каждое как префикс.
+
+    Слово из одного символа ищется только целиком. Возвращает None, если
+    в строке нет ни одного слова. Слова берутся в кавычки, поэтому
+    операторы FTS5 в тексте пользователя не действуют.
+    """
+    words = re.findall(r"\w+", text.replace("ё", "е").replace("Ё", "Е"))
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' if len(word) >= MIN_PREFIX_LENGTH else f'"{word}"'
+                    for word in words)
+
+# Больше совпадений не ранжируется: bm25 считается для каждого совпадения,
+# а слишком общий запрос всё равно не даёт осмысленного порядка
+SEARCH_RANK_LIMIT = 5000
+
+def search_books(conn, query, limit=20, offset=0):
+    """Полнотекстовый поиск книг по названию, автору и жанру.
+
+    Возвращает (число совпадений, строки). Совпадения считаются не дальше
+    SEARCH_RANK_LIMIT + 1: большее число означает только «больше
+    SEARCH_RANK_LIMIT», полный подсчёт на общем запросе стоит сотни
+    миллисекунд. Строки упорядочены по релевантности (при числе совпадений
+    больше SEARCH_RANK_LIMIT - по id) и, как в get_page, начинаются с id
+    книги, за которым идут столбцы BOOK_COLUMNS.
+    """
+    match = search_query(query)
+    if match is None:
+        return 0, []
+    c = conn.cursor()
+    c.execute("""SELECT COUNT(*) FROM (SELECT rowid FROM books_fts
+                WHERE books_fts MATCH ? LIMIT ?)""", (match, SEARCH_RANK_LIMIT + 1))
+    total = c.fetchone()[0]
+    order = "books_fts.rank" if total <= SEARCH_RANK_LIMIT else "books_fts.rowid"
+    c.execute(f"""SELECT b.id, {BOOK_COLUMNS} FROM books_fts
+                JOIN books b ON b.id = books_fts.rowid {NAME_JOINS}
+                WHERE books_fts MATCH ? ORDER BY {order} LIMIT ? OFFSET ?""",
+              (match, limit, offset))
+    return total, c.fetchall()
+
+def get_store_books_page(conn, store_name, after=None, limit=200):
+    """Книги магазина порциями по id книги: строки (id, название, автор)"""
+    c = conn.cursor()
+    c.execute("""SELECT b.id, b.title, a.name
+                FROM store_books sb
+                JOIN books b ON b.id = sb.book_id
+                LEFT JOIN authors a ON a.id = b.author_id
+                WHERE sb.store_id = (SELECT id FROM stores WHERE norm_name = ?)
+                  AND sb.book_id > ?
+                ORDER BY sb.book_id LIMIT ?""",
+              (normalize_name(store_name), after if after is not None else 0, limit))
+    return c.fetchall()
+
+def find_by_prefix(conn, table, prefix, limit=20):
+    """Имена (для книг - названия), нормализованный ключ которых начинается с prefix.
+
+    Диапазонный запрос по индексу norm_name, упорядоченный по ключу.
+    """
+    column = dict(migrations.NAMED_TABLES)[table]
+    key = normalize_name(prefix)
+    c = conn.cursor()
+    c.execute(f"""SELECT {column} FROM {table}
+                WHERE norm_name >= ? AND norm_name < ?
+                ORDER BY norm_name LIMIT ?""", (key, key + "\U0010ffff", limit))
     return [row[0] for row in c.fetchall()]
 
+def get_book(conn, title):
+    c = conn.cursor()
+    c.execute(f"SELECT {BOOK_COLUMNS} FROM {BOOK_JOINS} WHERE b.norm_name = ?",
+              (normalize_name(title),))
+    return c.fetchone()
+
+def get_store(conn, name):
+    """Название магазина в том виде, как оно хранится в базе, или None"""
+    c = conn.cursor()
+    c.execute("SELECT name FROM stores WHERE norm_name = ?", (normalize_name(name),))
+    row = c.fetchone()
+    return row[0] if row else None
+
+def get_author_genre_counts(conn):
+    c = conn.cursor()
+    c.execute("""SELECT a.name, g.name, x.book_count
+                FROM (SELECT author_id, genre_id, COUNT(*) AS book_count
+                      FROM books GROUP BY author_id, genre_id) x
+                LEFT JOIN authors a ON a.id = x.author_id
+                LEFT JOIN genres g ON g.id = x.genre_id""")
+    return c.fetchall()
+
+def get_price_stats(conn):
+    """Количество, сумма, минимум, максимум и сумма квадратов цен книг.
+
+    Книги без цены (NULL) не учитываются ни в одном значении, как и в
+    catalog.RunningStats при обновлении по журналу изменений.
+    """
+    c = conn.cursor()
+    c.execute("""SELECT COUNT(price), TOTAL(price), MIN(price), MAX(price), TOTAL(price * price)
+                FROM books""")
+    return c.fetchone()
+
+def get_price_bounds(conn):
+    """Минимальная и максимальная цена книг: два поиска по индексу idx_books_price.
+
+    MIN и MAX в одном SELECT SQLite считает полным проходом по таблице,
+    поэтому каждое значение читается отдельным подзапросом.
+    """
+    c = conn.cursor()
+    c.execute("SELECT (SELECT MIN(price) FROM books), (SELECT MAX(price) FROM books)")
+    return c.fetchone()
+
+def count_store_links(conn):
+    return count_rows(conn, "store_books")
+
+def get_data_version(conn):
+    """PRAGMA data_version: меняется, когда другое соединение фиксирует запись"""
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def get_change_log_bounds(conn):
+    """Первый и последний id журнала изменений; (0, 0), если журнал пуст"""
+    c = conn.cursor()
+    c.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM change_log")
+    return c.fetchone()
+
+def get_changes(conn, after, limit=None):
+    """Строки журнала после id after: (id, таблица, операция, old JSON, new JSON)"""
+    c = conn.cursor()
+    c.execute("""SELECT id, table_name, op, old, new FROM change_log
+                WHERE id > ? ORDER BY id LIMIT ?""", (after, -1 if limit is None else limit))
+    return c.fetchall()
+
+CHANGE_LOG_KEEP = 100000
+
+def prune_change_log(conn, keep=CHANGE_LOG_KEEP):
+    """Удаление старых строк журнала, кроме последних keep"""
+    c = conn.cursor()
+    c.execute("""DELETE FROM change_log
+                WHERE id <= (SELECT MAX(id) FROM change_log) - ?""", (keep,))
+    commit(conn)
+    return c.rowcount
+
 def main():
-    conn = sqlite3.connect('books.db')
+    conn = connection.connect(connection.DB_PATH)
     create_tables(conn)
     conn.close()
 
+# Замеры времени всех функций модуля (включаются BOOKSTORE_METRICS=1)
+metrics.instrument_module(globals(), "database", exclude=("main",))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
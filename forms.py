@@ -0,0 +1,119 @@
+# forms.py
+"""Диалоги добавления сущностей, построенные по описанию полей.
+
+ENTITY_FORMS описывает каждую форму (заголовок, размер, поля), EntityForm
+строит по описанию диалог, а DialogPool хранит построенные диалоги:
+каждый создаётся при первом открытии и дальше только сбрасывается перед
+показом. Выпадающие списки при сбросе перечитывают первую порцию из базы,
+поэтому в них сразу видны только что добавленные авторы и жанры.
+"""
+from PyQt5.QtGui import QDoubleValidator
+from PyQt5.QtWidgets import (
+    QComboBox, QDialog, QDialogButtonBox, QFormLayout, QLabel, QLineEdit, QVBoxLayout
+)
+
+import models
+import styles
+
+
+class Field:
+    """Поле формы: text - строка, price - число, lookup - список из таблицы"""
+    __slots__ = ("label", "kind", "table")
+
+    def __init__(self, label, kind="text", table=None):
+        self.label = label
+        self.kind = kind
+        self.table = table
+
+
+class FormSpec:
+    __slots__ = ("title", "size", "fields")
+
+    def __init__(self, title, size, fields):
+        self.title = title
+        self.size = size
+        self.fields = fields
+
+
+ENTITY_FORMS = {
+    "book": FormSpec("Добавить книгу", (400, 250), (
+        Field("Название:"),
+        Field("Автор:", "lookup", "authors"),
+        Field("Жанр:", "lookup", "genres"),
+        Field("Цена:", "price"),
+    )),
+    "author": FormSpec("Добавить автора", (300, 150), (Field("Имя автора:"),)),
+    "genre": FormSpec("Добавить жанр", (300, 150), (Field("Название жанра:"),)),
+    "store": FormSpec("Добавить магазин", (300, 150), (Field("Название магазина:"),)),
+    "customer": FormSpec("Добавить покупателя", (300, 150), (Field("Имя покупателя:"),)),
+}
+
+
+class EntityForm(QDialog):
+    """Диалог по FormSpec; OK вызывает on_submit(значения полей..., диалог).
+
+    Диалог закрывает сам on_submit (accept) после успешного добавления,
+    при ошибке форма остаётся открытой с введёнными значениями.
+    """
+
+    def __init__(self, spec, conn, on_submit, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(spec.title)
+        self.setFixedSize(*spec.size)
+
+        layout = QVBoxLayout(self)
+        title_label = QLabel(f"# {spec.title}")
+        title_label.setObjectName(styles.DIALOG_TITLE)
+        layout.addWidget(title_label)
+
+        form = QFormLayout()
+        self.inputs = [self._create_input(field, conn) for field in spec.fields]
+        for field, widget in zip(spec.fields, self.inputs):
+            form.addRow(field.label, widget)
+        layout.addLayout(form)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(lambda: on_submit(*self.values(), self))
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    @staticmethod
+    def _create_input(field, conn):
+        if field.kind == "lookup":
+            # Списки подгружаются из базы порциями, подсказки - по началу имени
+            return models.setup_lookup_combo(QComboBox(), conn, field.table)
+        widget = QLineEdit()
+        if field.kind == "price":
+            widget.setValidator(QDoubleValidator())
+        return widget
+
+    def values(self):
+        return [widget.currentText() if isinstance(widget, QComboBox) else widget.text()
+                for widget in self.inputs]
+
+    def reset(self):
+        """Очистка полей перед повторным показом"""
+        for widget in self.inputs:
+            if isinstance(widget, QComboBox):
+                widget.model().reload()
+                widget.setCurrentIndex(0)
+            else:
+                widget.clear()
+        self.inputs[0].setFocus()
+
+    def open_form(self):
+        self.reset()
+        return self.exec_()
+
+
+class DialogPool:
+    """Кэш диалогов по ключу: factory() вызывается только при первом запросе"""
+
+    def __init__(self):
+        self._dialogs = {}
+
+    def get(self, key, factory):
+        dialog = self._dialogs.get(key)
+        if dialog is None:
+            dialog = self._dialogs[key] = factory()
+        return dialog
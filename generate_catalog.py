@@ -0,0 +1,165 @@
+# generate_catalog.py
+"""Генератор синтетических баз каталога для нагрузочных замеров.
+
+Создаёт файл базы с текущей схемой (migrations.py) и заполняет его
+книгами, авторами, жанрами, магазинами, связями магазин-книга и
+покупателями с русскими названиями. Размер задаётся готовым масштабом
+(10k, 100k, 1m) и/или отдельными параметрами. Генерация
+детерминирована: одинаковый seed даёт одинаковую базу.
+
+Запуск: python generate_catalog.py out.db [--scale 100k] [--books N] [--seed 1] [--force]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import connection
+import database
+from names import normalize_name
+from transactions import transaction
+
+SCALES = {
+    "10k": {"books": 10_000, "authors": 1_000, "genres": 30,
+            "stores": 100, "links_per_store": 50, "customers": 1_000},
+    "100k": {"books": 100_000, "authors": 5_000, "genres": 40,
+             "stores": 500, "links_per_store": 200, "customers": 10_000},
+    "1m": {"books": 1_000_000, "authors": 20_000, "genres": 60,
+           "stores": 2_000, "links_per_store": 500, "customers": 50_000},
+}
+
+FIRST_NAMES = [
+    "Александр", "Алексей", "Анна", "Борис", "Вера", "Виктор", "Галина", "Григорий",
+    "Дарья", "Дмитрий", "Евгений", "Екатерина", "Елена", "Ефим", "Иван", "Ирина",
+    "Кирилл", "Лев", "Людмила", "Максим", "Мария", "Михаил", "Наталья", "Николай",
+    "Ольга", "Пётр", "Семён", "Сергей", "Татьяна", "Фёдор", "Юлия", "Ярослав",
+]
+SURNAME_ROOTS = [
+    "Иван", "Петр", "Сидор", "Смирн", "Кузнец", "Попов", "Васильев", "Соколов",
+    "Михайл", "Новик", "Фёдор", "Морозов", "Волк", "Алексе", "Лебед", "Семён",
+    "Егор", "Павл", "Козл", "Степан", "Никол", "Орл", "Андре", "Макар",
+    "Никит", "Захар", "Зайц", "Соловь", "Борисов", "Яковл", "Григорь", "Роман",
+    "Воробь", "Серге", "Кузьмин", "Фрол", "Александр", "Дмитри", "Корол", "Гусев",
+]
+SURNAME_SUFFIXES = ["ов", "ин", "ский", "енко", "ич", "ёв"]
+GENRES = [
+    "Роман", "Детектив", "Фантастика", "Фэнтези", "Ужасы", "Мистика", "Поэзия",
+    "Драма", "Комедия", "Приключения", "Исторический роман", "Биография",
+    "Мемуары", "Публицистика", "Научпоп", "Философия", "Психология", "Сказки",
+    "Триллер", "Боевик", "Антиутопия", "Классика", "Повесть", "Рассказы",
+    "Эссе", "Путешествия", "Кулинария", "Учебник", "Справочник", "Юмор",
+]
+ADJECTIVES = [
+    "Тихий", "Последний", "Зелёный", "Белый", "Чёрный", "Далёкий", "Старый",
+    "Новый", "Забытый", "Северный", "Южный", "Золотой", "Ночной", "Весёлый",
+    "Тайный", "Морской", "Лесной", "Красный", "Ледяной", "Вечный",
+]
+NOUNS = [
+    "дом", "сад", "берег", "путь", "город", "ветер", "лес", "остров", "мост",
+    "огонь", "зал", "край", "свет", "шёпот", "крик", "сон", "час", "полёт",
+    "дождь", "снег", "рассвет", "колодец", "маяк", "перевал",
+]
+STREETS = [
+    "Ленина", "Пушкина", "Гагарина", "Мира", "Садовой", "Невском", "Тверской",
+    "Арбате", "Победы", "Лесной", "Советской", "Набережной",
+]
+
+
+def _people(rng, count):
+    """count разных имён вида 'Имя Фамилия'"""
+    surnames = [root + suffix for root in SURNAME_ROOTS for suffix in SURNAME_SUFFIXES]
+    names = [f"{first} {last}" for first in FIRST_NAMES for last in surnames]
+    rng.shuffle(names)
+    if count <= len(names):
+        return names[:count]
+    # Имён не хватает: повторы различаются номером
+    extra = [f"{names[i % len(names)]} {i // len(names) + 1}-й"
+             for i in range(len(names), count)]
+    return names + extra
+
+
+def _numbered(base, count):
+    if count <= len(base):
+        return base[:count]
+    return base + [f"{base[i % len(base)]} {i // len(base) + 1}" for i in range(len(base), count)]
+
+
+def generate(path, books, authors, genres, stores, links_per_store, customers, seed=1):
+    """Заполнение новой базы path; возвращает число строк по таблицам"""
+    rng = random.Random(seed)
+    author_names = _people(rng, authors)
+    genre_names = _numbered(GENRES, genres)
+    customer_names = _people(rng, customers)
+    store_names = [f"Книжный №{i + 1} на {STREETS[i % len(STREETS)]}" for i in range(stores)]
+    links_per_store = min(links_per_store, books)
+
+    conn = connection.connect(path, synchronous="OFF")
+    try:
+        database.create_tables(conn)
+        with transaction(conn):
+            c = conn.cursor()
+            for table, names in (("authors", author_names), ("genres", genre_names),
+                                 ("stores", store_names), ("customers", customer_names)):
+                c.executemany(f"INSERT INTO {table} (id, name, norm_name) VALUES (?, ?, ?)",
+                              ((i, name, normalize_name(name)) for i, name in enumerate(names, 1)))
+            titles = (f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}, книга {i}"
+                      for i in range(1, books + 1))
+            c.executemany(
+                """INSERT INTO books (id, title, norm_name, author_id, genre_id, price)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                ((i, title, normalize_name(title), rng.randint(1, authors), rng.randint(1, genres),
+                  round(rng.uniform(100, 5000), 2))
+                 for i, title in enumerate(titles, 1)))
+            c.executemany(
+                "INSERT INTO store_books (store_id, book_id) VALUES (?, ?)",
+                ((store_id, book_id)
+                 for store_id in range(1, stores + 1)
+                 for book_id in sorted(rng.sample(range(1, books + 1), links_per_store))))
+            # Новая база: заполнение целиком не нужно никому пересылать по журналу.
+            # Счётчик id тоже сбрасывается, иначе первая же строка журнала
+            # выглядела бы для ChangeFeed как пропуск и вызывала перезагрузку
+            c.execute("DELETE FROM change_log")
+            c.execute("DELETE FROM sqlite_sequence WHERE name = 'change_log'")
+        counts = {table: database.count_rows(conn, table)
+                  for table in ("books", "authors", "genres", "stores", "customers")}
+        counts["store_books"] = database.count_store_links(conn)
+        return counts
+    finally:
+        conn.close()
+
+
+def remove_database(path):
+    """Удаление файла базы вместе с файлами WAL"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация синтетического каталога книг")
+    parser.add_argument("path", help="файл создаваемой базы")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    for name in SCALES["10k"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                            help="переопределяет значение масштаба")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="перезаписать существующий файл")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path):
+        if not args.force:
+            sys.exit(f"Файл {args.path} уже существует (--force для перезаписи)")
+        remove_database(args.path)
+
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+    started = time.perf_counter()
+    counts = generate(args.path, seed=args.seed, **sizes)
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    print(f"Готово за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
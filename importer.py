@@ -0,0 +1,171 @@
+# importer.py
+"""Массовый импорт каталога поставщика из CSV или JSONL.
+
+Каждая запись содержит поля title, author, genre, price и необязательное
+поле store (магазин, в библиотеку которого добавляется книга). Записи
+вставляются пачками через executemany, одна пачка - одна транзакция.
+Недостающие авторы, жанры и магазины создаются в том же проходе, уже
+существующие строки пропускаются (INSERT OR IGNORE).
+
+Запуск: python importer.py catalog.csv [--db books.db] [--chunk-size 5000]
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import connection
+import database
+from names import normalize_name
+from transactions import transaction
+
+TABLES = ("books", "authors", "genres", "stores", "store_books")
+
+BOOK_INSERT = """INSERT OR IGNORE INTO books (title, norm_name, author_id, genre_id, price)
+                 VALUES (?, ?, (SELECT id FROM authors WHERE norm_name = ?),
+                         (SELECT id FROM genres WHERE norm_name = ?), ?)"""
+LINK_INSERT = """INSERT OR IGNORE INTO store_books (store_id, book_id)
+                 SELECT s.id, b.id FROM stores s, books b
+                 WHERE s.norm_name = ? AND b.norm_name = ?"""
+
+
+def parse_json_lines(lines):
+    """Записи из строк JSONL; вместо строки с некорректным JSON - None"""
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def read_records(path):
+    """Потоковое чтение записей из .csv (с заголовком) или .jsonl"""
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            yield from parse_json_lines(f)
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def _normalize(record):
+    """Кортеж (title, author, genre, price, store) или None для некорректной записи"""
+    if not isinstance(record, dict):
+        return None
+    title = (record.get("title") or "").strip()
+    author = (record.get("author") or "").strip()
+    genre = (record.get("genre") or "").strip()
+    store = (record.get("store") or "").strip() or None
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        return None
+    if not (title and author and genre):
+        return None
+    return title, author, genre, price, store
+
+
+def _insert(cursor, sql, rows):
+    """executemany с подсчётом реально вставленных строк"""
+    if not rows:
+        return 0
+    cursor.executemany(sql, rows)
+    return cursor.rowcount
+
+
+def _named_rows(names):
+    """Строки (имя, ключ) без повторов ключа внутри пачки; первое написание остаётся"""
+    rows = {}
+    for name in names:
+        rows.setdefault(normalize_name(name), name)
+    return [(name, key) for key, name in rows.items()]
+
+
+def _import_chunk(conn, chunk, stats):
+    authors = _named_rows(row[1] for row in chunk)
+    genres = _named_rows(row[2] for row in chunk)
+    stores = _named_rows(row[4] for row in chunk if row[4])
+    books = [(title, normalize_name(title), normalize_name(author), normalize_name(genre), price)
+             for title, author, genre, price, _ in chunk]
+    links = [(normalize_name(row[4]), normalize_name(row[0])) for row in chunk if row[4]]
+
+    with transaction(conn):
+        c = conn.cursor()
+        for table, sql, rows in (
+            ("authors", "INSERT OR IGNORE INTO authors (name, norm_name) VALUES (?, ?)", authors),
+            ("genres", "INSERT OR IGNORE INTO genres (name, norm_name) VALUES (?, ?)", genres),
+            ("stores", "INSERT OR IGNORE INTO stores (name, norm_name) VALUES (?, ?)", stores),
+            ("books", BOOK_INSERT, books),
+            ("store_books", LINK_INSERT, links),
+        ):
+            inserted = _insert(c, sql, rows)
+            stats[table]["inserted"] += inserted
+            stats[table]["skipped"] += len(rows) - inserted
+
+
+def bulk_import(conn, records, chunk_size=5000, progress=None):
+    """Импорт записей пачками по chunk_size.
+
+    progress(rows_done, seconds_elapsed) вызывается после каждой пачки.
+    Возвращает словарь {таблица: {"inserted": n, "skipped": m}} и число
+    отброшенных некорректных записей под ключом "invalid".
+    """
+    stats = {table: {"inserted": 0, "skipped": 0} for table in TABLES}
+    stats["invalid"] = 0
+    started = time.perf_counter()
+    done = 0
+    chunk = []
+
+    for record in records:
+        row = _normalize(record)
+        if row is None:
+            stats["invalid"] += 1
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _import_chunk(conn, chunk, stats)
+            done += len(chunk)
+            chunk = []
+            if progress:
+                progress(done, time.perf_counter() - started)
+
+    if chunk:
+        _import_chunk(conn, chunk, stats)
+        done += len(chunk)
+        if progress:
+            progress(done, time.perf_counter() - started)
+    return stats
+
+
+def print_progress(done, elapsed):
+    rate = done / elapsed if elapsed > 0 else 0
+    sys.stderr.write(f"\rОбработано строк: {done} ({rate:.0f} строк/с)")
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовый импорт каталога книг")
+    parser.add_argument("path", help="файл .csv или .jsonl")
+    parser.add_argument("--db", default=connection.DB_PATH, help="файл базы данных")
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="число записей в одной транзакции")
+    args = parser.parse_args(argv)
+
+    conn = connection.connect(args.db)
+    try:
+        database.create_tables(conn)
+        stats = bulk_import(conn, read_records(args.path), args.chunk_size, print_progress)
+    finally:
+        conn.close()
+
+    sys.stderr.write("\n")
+    for table in TABLES:
+        print(f"{table}: добавлено {stats[table]['inserted']}, пропущено {stats[table]['skipped']}")
+    print(f"Некорректных записей: {stats['invalid']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# loadtest.py
+"""Нагрузочный тест HTTP API каталога (api_server.py).
+
+Открывает --concurrency соединений keep-alive и в течение --duration
+секунд шлёт запросы из смеси --mix: read - страницы книг, поиск,
+библиотеки магазинов и итоги; write - добавление авторов и книг; mixed -
+десятая часть записей. С --conditional повторные GET отправляются с
+If-None-Match последнего ETag. В конце печатаются запросы в секунду,
+коды ответов и перцентили задержки.
+
+Запуск: python api_server.py --db каталог.db &
+        python loadtest.py [--port 8080] [--concurrency 32] [--duration 10] [--mix mixed]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from metrics import LatencyHistogram
+
+SEARCH_WORDS = ["ночной", "тихий", "дом", "сад", "ветер", "роман", "детектив", "лес", "мост"]
+
+
+class Client:
+    """Одно соединение keep-alive с последовательными запросами"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}",
+                 f"Content-Length: {len(data)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+        await self.writer.drain()
+
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(head[0].split(" ", 2)[1])
+        response_headers = {}
+        for line in head[1:]:
+            if line:
+                name, value = line.split(":", 1)
+                response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get("content-length", 0))
+        payload = await self.reader.readexactly(length) if length else b""
+        if response_headers.get("connection") == "close":
+            self.close()
+        return status, response_headers, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class Workload:
+    """Генератор запросов по размеру каталога из /stats и списку магазинов"""
+
+    def __init__(self, stats, stores, mix, seed):
+        self.books = max(1, stats["books"])
+        self.stores = stores
+        self.mix = mix
+        self.rng = random.Random(seed)
+        # Имена новых записей уникальны между запусками
+        self.run_tag = f"{time.time_ns():x}"
+        self.counter = 0
+
+    def next_request(self):
+        rng = self.rng
+        write_share = {"read": 0.0, "write": 1.0, "mixed": 0.1}[self.mix]
+        if rng.random() < write_share:
+            self.counter += 1
+            tag = f"{self.run_tag}-{self.counter}"
+            if rng.random() < 0.5:
+                return "POST", "/authors", {"name": f"Нагрузочный автор {tag}"}
+            return "POST", "/books", {"title": f"Нагрузочная книга {tag}",
+                                      "author": f"Нагрузочный автор {tag}",
+                                      "genre": "Нагрузка", "price": 100}
+        kind = rng.random()
+        if kind < 0.5:
+            return "GET", f"/books?after={rng.randrange(self.books)}&limit=20", None
+        if kind < 0.7:
+            return "GET", f"/books/search?q={quote(rng.choice(SEARCH_WORDS))}&limit=20", None
+        if kind < 0.9 and self.stores:
+            return "GET", f"/stores/{quote(rng.choice(self.stores))}/books?limit=50", None
+        return "GET", "/stats", None
+
+
+async def worker(client, workload, deadline, conditional, histogram, statuses):
+    etags = {}
+    while time.perf_counter() < deadline:
+        method, path, body = workload.next_request()
+        headers = {"If-None-Match": etags[path]} if conditional and path in etags else None
+        started = time.perf_counter()
+        try:
+            status, response_headers, _ = await client.request(method, path, body, headers)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            statuses[type(e).__name__] += 1
+            client.close()
+            continue
+        histogram.add((time.perf_counter() - started) * 1000)
+        statuses[status] += 1
+        if conditional and "etag" in response_headers:
+            etags[path] = response_headers["etag"]
+
+
+async def run(host, port, concurrency, duration, mix, conditional, seed=1):
+    probe = Client(host, port)
+    _, _, payload = await probe.request("GET", "/stats")
+    stats = json.loads(payload)
+    _, _, payload = await probe.request("GET", "/stores?limit=500")
+    stores = [store["name"] for store in json.loads(payload)["items"]]
+    probe.close()
+    workload = Workload(stats, stores, mix, seed)
+
+    histogram = LatencyHistogram()
+    statuses = Counter()
+    clients = [Client(host, port) for _ in range(concurrency)]
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(client, workload, deadline, conditional, histogram, statuses)
+                           for client in clients))
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.close()
+    return histogram, statuses, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API каталога")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", choices=("read", "write", "mixed"), default="mixed")
+    parser.add_argument("--conditional", action="store_true",
+                        help="повторные GET с If-None-Match")
+    args = parser.parse_args(argv)
+
+    histogram, statuses, elapsed = asyncio.run(run(
+        args.host, args.port, args.concurrency, args.duration, args.mix, args.conditional))
+    print(f"Запросов: {histogram.count} за {elapsed:.1f} с, {histogram.count / elapsed:.0f} в секунду")
+    print("Ответы: " + ", ".join(f"{status}: {count}" for status, count in sorted(
+        statuses.items(), key=lambda item: str(item[0]))))
+    if histogram.count:
+        print(f"Задержка, мс: среднее {histogram.mean():.2f}, p50 {histogram.percentile(0.5):.2f}, "
+              f"p95 {histogram.percentile(0.95):.2f}, p99 {histogram.percentile(0.99):.2f}, "
+              f"максимум {histogram.max:.2f}")
+
+
+if __name__ == "__main__":
+    main()
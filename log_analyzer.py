@@ -0,0 +1,139 @@
+# log_analyzer.py
+"""Потоковый разбор журналов приложения.
+
+Читает app.log и его архивы после ротации (app.log.1.gz, app.log.2.gz, ...)
+от старых к новым, построчно и без загрузки файлов в память. Понимает оба
+формата AppLogger: текстовый и JSON-строки. По каждой операции считает
+число записей, долю ошибок и перцентили длительности p50/p95/p99.
+
+Длительности копятся в гистограмме с фиксированными геометрическими
+корзинами, поэтому память не растёт с размером журнала; погрешность
+перцентиля не больше ширины корзины (около 5%).
+
+Запуск: python log_analyzer.py [app.log]
+"""
+import gzip
+import json
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from metrics import LatencyHistogram
+
+# Текстовый формат: "2024-01-01 12:00:00,000 - INFO - сообщение"
+_TEXT_LINE = re.compile(r"^\S+ \S+ - (?P<level>[A-Z]+) - (?P<message>.*)$")
+_TEXT_OPERATION = re.compile(r"^Операция: (?P<operation>[a-z_]+)\b(?:.*\| (?P<duration>[\d.]+) мс$)?")
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def error_rate(self):
+        return self.errors / self.count if self.count else 0.0
+
+
+def log_files(path):
+    """Файл журнала и его архивы в хронологическом порядке"""
+    path = Path(path)
+    rotated = []
+    for candidate in path.parent.glob(path.name + ".*"):
+        suffix = candidate.name[len(path.name) + 1:].removesuffix(".gz")
+        if suffix.isdigit():
+            rotated.append((int(suffix), candidate))
+        else:
+            # TimedRotatingFileHandler: суффикс - дата, сортируется как строка
+            rotated.append((suffix, candidate))
+    numbered = sorted((item for item in rotated if isinstance(item[0], int)), reverse=True)
+    dated = sorted(item for item in rotated if isinstance(item[0], str))
+    files = [candidate for _, candidate in numbered + dated]
+    if path.exists():
+        files.append(path)
+    return files
+
+
+def _open(path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def parse_line(line):
+    """(уровень, операция, длительность в мс) или None для нераспознанной строки"""
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        return entry.get("level"), entry.get("operation"), entry.get("duration_ms")
+    match = _TEXT_LINE.match(line)
+    if match is None:
+        return None
+    level = match.group("level")
+    operation = duration = None
+    op_match = _TEXT_OPERATION.match(match.group("message"))
+    if op_match:
+        operation = op_match.group("operation")
+        if op_match.group("duration"):
+            duration = float(op_match.group("duration"))
+    return level, operation, duration
+
+
+def analyze(paths):
+    """Статистика по операциям: {операция: OperationStats}.
+
+    Ошибки без операции учитываются под именем '-'.
+    """
+    stats = defaultdict(OperationStats)
+    for path in paths:
+        with _open(path) as lines:
+            for line in lines:
+                parsed = parse_line(line.rstrip("\n"))
+                if parsed is None:
+                    continue
+                level, operation, duration = parsed
+                is_error = level in ("ERROR", "CRITICAL")
+                if operation is None:
+                    if not is_error:
+                        continue
+                    operation = "-"
+                entry = stats[operation]
+                entry.count += 1
+                if is_error:
+                    entry.errors += 1
+                if duration is not None:
+                    entry.latency.add(duration)
+    return stats
+
+
+def _ms(value):
+    return f"{value:.3f}" if value is not None else "-"
+
+
+def print_report(stats):
+    print(f"{'операция':<20} {'записей':>8} {'ошибки':>8} {'p50, мс':>10} "
+          f"{'p95, мс':>10} {'p99, мс':>10} {'макс, мс':>10}")
+    for operation in sorted(stats, key=lambda name: -stats[name].count):
+        entry = stats[operation]
+        latency = entry.latency
+        print(f"{operation:<20} {entry.count:>8} {entry.error_rate():>8.1%} "
+              f"{_ms(latency.percentile(0.50)):>10} {_ms(latency.percentile(0.95)):>10} "
+              f"{_ms(latency.percentile(0.99)):>10} {_ms(latency.max if latency.count else None):>10}")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    files = log_files(args[0] if args else "app.log")
+    if not files:
+        print("Файлы журнала не найдены")
+        sys.exit(1)
+    print_report(analyze(files))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,167 @@
+import atexit
+import json
 import logging
-from datetime import datetime
+import logging.handlers
+import os
+import queue
+import sys
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Передаёт запись в очередь без форматирования в вызывающем потоке.
+
+    Сообщение в %-стиле собирается уже фоновым потоком записи, поэтому
+    вызывающий код платит только за создание записи и put в очередь.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Трассировку нужно превратить в текст, пока она ещё доступна
+            return super().prepare(record)
+        return record
+
+
+def _gzip_rotator(source, dest):
+    """Сжатие файла, уходящего в архив при ротации"""
+    # Ротация редка, поэтому gzip и shutil не замедляют запуск
+    import gzip
+    import shutil
+
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON с фиксированным набором полей"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'operation': getattr(record, 'operation', None),
+            'entity_type': getattr(record, 'entity_type', None),
+            'name': getattr(record, 'entity_name', None),
+            'duration_ms': getattr(record, 'duration_ms', None),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
 
 class AppLogger:
-    def __init__(self, log_file='app.log'):
+    """Журнал приложения с фоновой записью через QueueHandler/QueueListener.
+
+    Уровень задаётся аргументом level или переменной окружения
+    BOOKSTORE_LOG_LEVEL (по умолчанию INFO), дублирование в консоль -
+    аргументом console или BOOKSTORE_LOG_CONSOLE=1. Сообщения принимаются
+    в %-стиле: log_debug("Блок %d", i) ничего не форматирует, если уровень
+    DEBUG выключен.
+
+    Файл журнала ротируется по размеру (max_bytes, BOOKSTORE_LOG_MAX_BYTES)
+    или по времени (when, например 'midnight', BOOKSTORE_LOG_ROTATE_WHEN);
+    архивные файлы сжимаются в .gz, хранится backup_count последних.
+    Формат 'json' (BOOKSTORE_LOG_FORMAT=json) пишет JSON-строки с полями
+    operation, entity_type, name и duration_ms; их читает log_analyzer.py.
+    """
+
+    def __init__(self, log_file='app.log', level=None, console=None, log_format=None,
+                 max_bytes=None, backup_count=5, when=None):
         self.log_file = log_file
-        self._setup_logging()
-        
-    def _setup_logging(self):
-        logging.basicConfig(
-            filename=self.log_file,
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            encoding='utf-8'
-        )
-        
-    def log_info(self, message):
-        logging.info(message)
-        print(f"[INFO] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}")
-        
-    def log_error(self, message):
-        logging.error(message)
-        print(f"[ERROR] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}")
-        
-    def log_operation(self, operation, obj=None):
-        msg = f"Операция: {operation}"
+        if level is None:
+            level = os.environ.get("BOOKSTORE_LOG_LEVEL", "INFO").upper()
+        if console is None:
+            console = os.environ.get("BOOKSTORE_LOG_CONSOLE") == "1"
+        if log_format is None:
+            log_format = os.environ.get("BOOKSTORE_LOG_FORMAT", "text")
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("BOOKSTORE_LOG_MAX_BYTES", 1024 * 1024))
+        if when is None:
+            when = os.environ.get("BOOKSTORE_LOG_ROTATE_WHEN")
+        self.console = console
+        self.log_format = log_format
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.when = when
+        self._logger = logging.getLogger("bookstore")
+        self._listener = None
+        self._setup_logging(level)
+
+    def _setup_logging(self, level):
+        handlers = [self._file_handler()]
+        if self.console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter(
+                '[%(levelname)s] %(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(log_queue, *handlers)
+        self._listener.start()
+        atexit.register(self.stop)
+
+        self._logger.handlers = [_DeferredQueueHandler(log_queue)]
+        self._logger.propagate = False
+        self._logger.setLevel(level)
+
+    def _file_handler(self):
+        if self.when:
+            handler = logging.handlers.TimedRotatingFileHandler(
+                self.log_file, when=self.when, backupCount=self.backup_count, encoding='utf-8')
+        else:
+            handler = logging.handlers.RotatingFileHandler(
+                self.log_file, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                encoding='utf-8')
+        handler.rotator = _gzip_rotator
+        handler.namer = _gzip_namer
+        if self.log_format == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        return handler
+
+    def log_debug(self, message, *args):
+        self._logger.debug(message, *args)
+
+    def log_info(self, message, *args):
+        self._logger.info(message, *args)
+
+    def log_error(self, message, *args, operation=None):
+        if operation:
+            # В текстовом формате операция нужна в самом сообщении для log_analyzer
+            message = "Операция: %s | " + message
+            args = (operation,) + args
+        self._logger.error(message, *args, extra={'operation': operation})
+
+    def log_operation(self, operation, obj=None, duration=None):
+        """Запись об операции; duration - длительность в секундах"""
+        if not self._logger.isEnabledFor(logging.INFO):
+            return
+        extra = {
+            'operation': operation,
+            'entity_type': type(obj).__name__ if obj else None,
+            'entity_name': getattr(obj, 'name', None),
+            'duration_ms': round(duration * 1000, 3) if duration is not None else None,
+        }
+        message = "Операция: %s"
+        args = [operation]
         if obj:
-            msg += f" | Объект: {type(obj).__name__} {obj.name if hasattr(obj, 'name') else ''}"
-        self.log_info(msg)
+            message += " | Объект: %s %s"
+            args += [extra['entity_type'], extra['entity_name'] or '']
+        if duration is not None:
+            message += " | %.3f мс"
+            args.append(extra['duration_ms'])
+        self._logger.info(message, *args, extra=extra)
+
+    def stop(self):
+        """Дописывает очередь и останавливает фоновый поток"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
 
 logger = AppLogger()
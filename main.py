@@ -1,43 +1,173 @@
+import time
+
+# Начало импорта модулей, первая фаза отчёта --profile-startup
+_STARTED = time.perf_counter()
+
 import sys
 import os
-import sqlite3
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QLineEdit, QComboBox, QListWidget,
-    QDialog, QDialogButtonBox, QFormLayout, QGroupBox, QMessageBox, QFrame, QListWidgetItem
+    QLabel, QPushButton, QLineEdit, QComboBox, QListView,
+    QDialog, QDialogButtonBox, QFormLayout, QGroupBox, QMessageBox, QFrame,
+    QAction
 )
-from PyQt5.QtGui import QDoubleValidator, QFont, QIcon, QPixmap, QColor
-from PyQt5.QtCore import Qt, QLibraryInfo
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QColor, QKeySequence
+from PyQt5.QtCore import Qt, QLibraryInfo, QTimer
 
-from classes import Book, Author, Genre, Store, Customer
+from classes import Author, Genre, Store, Customer
+from catalog import Catalog
+from changes import ChangeFeed
+import connection
 import database
+import metrics
+import styles
+from paging import PagedSource, SearchSource
 from logger import logger
+from transactions import transaction
+from worker import DataWorker
+# models и forms (модели и формы диалогов) импортируются при первом открытии диалога
+
+
+# Интервал отложенной отрисовки блоков: один кадр при 60 Гц
+RENDER_INTERVAL_MS = 16
+# Интервал опроса журнала изменений (других окон, cli.py, api_server.py)
+CHANGE_POLL_MS = 500
+
+
+def read_catalog_snapshot(conn):
+    """Итоги каталога для Catalog.load и id последней строки журнала изменений.
+
+    Читаются одним снимком базы, поэтому журнал после этого id содержит
+    ровно те изменения, которых в итогах ещё нет.
+    """
+    with transaction(conn):
+        return Catalog.read_totals(conn), database.get_change_log_bounds(conn)[1]
+
+
+def read_startup_data(conn):
+    """Фоновая часть запуска: миграции схемы, очистка журнала и снимок каталога"""
+    database.create_tables(conn)
+    database.prune_change_log(conn)
+    return read_catalog_snapshot(conn)
+
 
 class BookStoreApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, db_path=connection.DB_PATH, profile=None):
         super().__init__()
+        self.profile = profile  # metrics.StartupProfile в режиме --profile-startup
         self.setWindowTitle("Управление книжным магазином")
         self.setFixedSize(800, 450)
         
-        # Подключение к базе данных
-        self.conn = sqlite3.connect('books.db')
-        database.create_tables(self.conn)
-        
-        # Загрузка данных
-        self.load_data()
+        # Подключение к базе данных: соединение окна только читает страницы
+        # категорий, остальные запросы и все записи идут через фоновый DataWorker
+        self.conn = connection.connect(db_path)
+        self.worker = DataWorker(db_path, parent=self)
+        self.mark_startup("соединения с базой")
         
         # Инициализация текущей категории и индекса
         self.current_category = None
         self.current_index = 0
+        self.search_results = None  # SearchSource активного поиска книг
+        self.dialogs = None  # forms.DialogPool, создаётся с первым диалогом
+        
+        # Отрисовка блоков не чаще раза в кадр: серии нажатий навигации
+        # сливаются в одну; rendered_text - последний текст каждой надписи
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(RENDER_INTERVAL_MS)
+        self.render_timer.timeout.connect(self.update_info_blocks)
+        self.rendered_text = {}
+        
+        # Изменения базы применяются по журналу (changes.ChangeFeed), в том
+        # числе свои: записи окна идут через соединение DataWorker
+        self.changes = None
+        self.reloading = False
+        self.change_timer = QTimer(self)
+        self.change_timer.setInterval(CHANGE_POLL_MS)
+        self.change_timer.timeout.connect(self.poll_changes)
         
         # Создаем зеленую иконку для списка
         self.green_icon = self.create_green_icon()
         
         # Настройка интерфейса
         self.setup_ui()
+        self.mark_startup("построение интерфейса")
         
+        # Окно показывается сразу, данные загружаются в фоне
+        self.set_loading(True)
+        self.worker.submit(read_startup_data, on_result=self.on_data_loaded,
+                           on_error=self.worker_error("load_data"), write=True)
+
+    def set_loading(self, loading):
+        """Индикатор загрузки: элементы управления недоступны, пока нет данных"""
+        self.centralWidget().setEnabled(not loading)
+        if loading:
+            self.set_label_text(self.center_block_content, "Загрузка данных...")
+
+    def on_data_loaded(self, snapshot):
+        self.mark_startup("ожидание данных каталога (фон)")
+        totals, last_change = snapshot
+        self.load_data(totals)
+        self.changes = ChangeFeed(self.conn, last_change)
+        self.change_timer.start()
+        self.set_loading(False)
         # Показать стартовую страницу (книги)
         self.show_category("books")
+        self.mark_startup("первая страница данных")
+
+    def poll_changes(self):
+        """Применение новых строк журнала изменений к каталогу и спискам.
+
+        Перечитываются только категории, которых коснулись изменения; если
+        журнал не покрывает пропущенное, каталог перезагружается целиком.
+        """
+        if self.changes is None or self.reloading:
+            return
+        changes = self.changes.poll()
+        if changes is None:
+            self.reload_data()
+            return
+        if not changes:
+            return
+        touched = self.catalog.apply_changes(changes)
+        sources = {"books": self.books, "authors": self.authors, "genres": self.genres,
+                   "stores": self.stores, "customers": self.customers}
+        for category in touched:
+            sources[category].invalidate()
+        if "books" in touched and self.search_results is not None:
+            self.search_results.invalidate()
+        self.refresh_view()
+
+    def reload_data(self):
+        """Полная перезагрузка итогов каталога в фоне"""
+        self.reloading = True
+        self.worker.submit(read_catalog_snapshot, on_result=self.on_data_reloaded,
+                           on_error=self.worker_error("reload_data"))
+
+    def on_data_reloaded(self, snapshot):
+        totals, last_change = snapshot
+        self.load_data(totals)
+        self.changes.reset(last_change)
+        self.reloading = False
+        if self.search_results is not None:
+            self.search_results = self.start_search(self.search_results.query)
+        self.refresh_view()
+
+    def refresh_view(self):
+        """Перерисовка после изменения данных; позиция не выходит за новый конец списка"""
+        self.current_index = min(self.current_index, self.last_index())
+        self.update_info_blocks()
+
+    def mark_startup(self, phase):
+        if self.profile is not None:
+            self.profile.mark(phase)
+
+    def worker_error(self, operation):
+        """Обработчик ошибки фоновой задачи для операции operation"""
+        def handle(error):
+            logger.log_error("Ошибка фоновой задачи: %s", error, operation=operation)
+            QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {error}")
+        return handle
 
     def create_green_icon(self):
         pixmap = QPixmap(16, 16)
@@ -47,43 +177,19 @@ class BookStoreApp(QMainWindow):
         icon = QIcon(pixmap)
         return icon
 
-    def load_data(self):
-        """Загрузка данных из базы данных"""
-        self.books = []
-        self.authors = []
-        self.genres = []
-        self.stores = []
-        self.customers = []
-        
-        cur = self.conn.cursor()
-        
-        # Загрузка авторов
-        cur.execute("SELECT name FROM authors")
-        self.authors = [Author(row[0]) for row in cur.fetchall()]
-        
-        # Загрузка жанров
-        cur.execute("SELECT name FROM genres")
-        self.genres = [Genre(row[0]) for row in cur.fetchall()]
-        
-        # Загрузка книг
-        cur.execute("SELECT title, author, genre, price FROM books")
-        self.books = [Book(row[0], Author(row[1]), Genre(row[2]), row[3]) for row in cur.fetchall()]
-        
-        # Загрузка магазинов
-        cur.execute("SELECT name FROM stores")
-        for row in cur.fetchall():
-            store = Store(row[0])
-            # Загрузка книг для магазина
-            cur.execute("SELECT book_title FROM store_books WHERE store_name = ?", (row[0],))
-            for book_row in cur.fetchall():
-                book = next((b for b in self.books if b.name == book_row[0]), None)
-                if book:
-                    store.library.append(book)
-            self.stores.append(store)
-        
-        # Загрузка покупателей
-        cur.execute("SELECT name FROM customers")
-        self.customers = [Customer(row[0]) for row in cur.fetchall()]
+    @metrics.timed("app.load_data")
+    def load_data(self, totals=None):
+        """Подключение постраничных источников данных для всех категорий.
+
+        totals - итоги каталога, уже прочитанные в фоне (Catalog.read_totals).
+        """
+        self.catalog = Catalog(self.conn)
+        self.catalog.load(totals)
+        self.books = PagedSource(self.conn, "books", self.catalog.book_from_row)
+        self.authors = PagedSource(self.conn, "authors", lambda row: self.catalog.author(row[0]))
+        self.genres = PagedSource(self.conn, "genres", lambda row: self.catalog.genre(row[0]))
+        self.stores = PagedSource(self.conn, "stores", self.catalog.stores_from_rows, batch=True)
+        self.customers = PagedSource(self.conn, "customers", lambda row: Customer(row[0]))
 
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
@@ -105,69 +211,34 @@ class BookStoreApp(QMainWindow):
         # Панель кнопок добавления (по центру)
         self.setup_action_buttons(main_layout)
         
-        # Установка стилей
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: white;
-            }
-            QGroupBox {
-                background-color: white;
-                border: 2px solid #4CAF50;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 15px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 3px;
-                color: #333;
-                font-weight: bold;
-                font-size: 14px;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                border: none;
-                color: white;
-                padding: 8px 16px;
-                text-align: center;
-                font-size: 14px;
-                margin: 4px 2px;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-            QLabel {
-                font-size: 14px;
-                margin: 6px;
-                color: #333;
-            }
-            QListWidget {
-                background-color: white;
-                border: 1px solid #a0c0a0;
-                border-radius: 4px;
-                font-size: 14px;
-            }
-            QLineEdit, QComboBox {
-                padding: 6px;
-                font-size: 14px;
-                border: 1px solid #a0c0a0;
-                border-radius: 4px;
-                background-color: white;
-            }
-        """)
+        # Скрытое действие: отчёт о замерах времени (metrics.py)
+        metrics_action = QAction("Отчёт о замерах", self)
+        metrics_action.setShortcut(QKeySequence("Ctrl+Shift+M"))
+        metrics_action.triggered.connect(self.dump_metrics)
+        self.addAction(metrics_action)
+        
+        # Общая таблица стилей окна и всех его диалогов
+        self.setStyleSheet(styles.MAIN_WINDOW)
 
     def setup_top_navigation(self, main_layout):
         """Настройка верхней панели навигации (выровнена по правому краю)"""
         nav_frame = QFrame()
-        nav_frame.setStyleSheet("background-color: green;")  # Зеленый фон блока
+        nav_frame.setObjectName(styles.NAV_FRAME)  # Зеленый фон блока
         nav_frame.setFixedHeight(int(35 * 1.6))  # Высота блока 160% от высоты кнопки
         nav_layout = QHBoxLayout(nav_frame)
         nav_layout.setContentsMargins(0, 0, 0, 0)
         nav_layout.setSpacing(2)
         
-        # Добавляем растягивающий элемент слева
+        # Поле полнотекстового поиска книг
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск книг")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setFixedSize(200, 35)
+        self.search_input.returnPressed.connect(self.run_search)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        nav_layout.addWidget(self.search_input)
+        
+        # Растягивающий элемент между поиском и кнопками
         nav_layout.addStretch()
         
         # Кнопки навигации
@@ -177,16 +248,11 @@ class BookStoreApp(QMainWindow):
         self.stores_btn = QPushButton("Магазины")
         self.customers_btn = QPushButton("Покупатели")
         
-        # Установка размера и стиля
+        # Установка размера (цвета задаёт styles.MAIN_WINDOW)
         for btn in [self.books_btn, self.authors_btn, self.genres_btn, 
                    self.stores_btn, self.customers_btn]:
             btn.setFixedSize(int(100 * 1.1), 35)  # Кнопки на 10% шире
             btn.setFont(QFont("Arial", 10))
-            btn.setStyleSheet(
-                "background-color: #4B0000;"  # Тёмно-багровый фон кнопок
-                "color: white;"               # Белый цвет текста
-                "border-radius: 6px;"         # Немного закругленные углы
-            )
         
         # Подключение обработчиков
         self.books_btn.clicked.connect(lambda: self.show_category("books"))
@@ -212,14 +278,14 @@ class BookStoreApp(QMainWindow):
         self.prev_btn = QPushButton("←")
         self.prev_btn.setFixedSize(60, 60)
         self.prev_btn.setFont(QFont("Arial", 24))
-        self.prev_btn.setStyleSheet("padding: 10px;")  # Внутренний отступ кнопки
+        self.prev_btn.setObjectName(styles.NAV_ARROW)
         self.prev_btn.clicked.connect(lambda: self.navigate_blocks(-1, 5))
         
         # Кнопка "вперед" справа
         self.next_btn = QPushButton("→")
         self.next_btn.setFixedSize(60, 60)
         self.next_btn.setFont(QFont("Arial", 24))
-        self.next_btn.setStyleSheet("padding: 10px;")  # Внутренний отступ кнопки
+        self.next_btn.setObjectName(styles.NAV_ARROW)
         self.next_btn.clicked.connect(lambda: self.navigate_blocks(1, 5))
         
         # Вертикальный layout для двух рядов блоков
@@ -238,6 +304,7 @@ class BookStoreApp(QMainWindow):
             
             title = QLabel()
             title.setFont(QFont("Arial", 12, QFont.Bold))
+            title.setAlignment(Qt.AlignCenter)
             block_layout.addWidget(title)
             
             content = QLabel()
@@ -259,6 +326,7 @@ class BookStoreApp(QMainWindow):
         
         self.left_block_title = QLabel()
         self.left_block_title.setFont(QFont("Arial", 12, QFont.Bold))
+        self.left_block_title.setAlignment(Qt.AlignCenter)
         left_block_layout.addWidget(self.left_block_title)
         
         self.left_block_content = QLabel()
@@ -292,6 +360,7 @@ class BookStoreApp(QMainWindow):
         
         self.right_block_title = QLabel()
         self.right_block_title.setFont(QFont("Arial", 12, QFont.Bold))
+        self.right_block_title.setAlignment(Qt.AlignCenter)
         right_block_layout.addWidget(self.right_block_title)
         
         self.right_block_content = QLabel()
@@ -325,33 +394,27 @@ class BookStoreApp(QMainWindow):
         # Добавляем blocks_layout в основной layout для отображения
         main_layout.addLayout(blocks_layout)
 
+    @metrics.timed("app.navigate_blocks")
     def navigate_blocks(self, direction, block_index):
-        """Навигация по блокам информации"""
-        logger.log_info(f"navigate_blocks called with direction={direction}, block_index={block_index}, current_index={self.current_index}, current_category={self.current_category}")
-        self.current_index += direction
-        
-        # Проверка границ
-        items = []
-        if self.current_category == "books":
-            items = self.books
-        elif self.current_category == "authors":
-            items = self.authors
-        elif self.current_category == "genres":
-            items = self.genres
-        elif self.current_category == "stores":
-            items = self.stores
-        elif self.current_category == "customers":
-            items = self.customers
-        
-        logger.log_info(f"Items count: {len(items)} before boundary check, current_index: {self.current_index}")
-        if self.current_index < 0:
-            self.current_index = 0
-        max_index = max(0, len(items) - block_index)
-        if self.current_index > max_index:
-            self.current_index = max_index
-        logger.log_info(f"Adjusted current_index: {self.current_index}")
-        
-        self.update_info_blocks()
+        """Навигация по блокам информации.
+
+        Индекс меняется сразу, а отрисовка откладывается до следующего кадра:
+        серия быстрых нажатий даёт одну перерисовку.
+        """
+        self.current_index = min(max(self.current_index + direction, 0),
+                                 self.last_index(block_index))
+        self.schedule_render()
+
+    def last_index(self, visible=5):
+        """Наибольший индекс первого блока, при котором видны visible элементов"""
+        return max(0, len(self.current_items()) - visible)
+
+    def current_items(self):
+        """Источник данных текущей категории (результаты поиска, если он активен)"""
+        if self.current_category == "books" and self.search_results is not None:
+            return self.search_results
+        return {"books": self.books, "authors": self.authors, "genres": self.genres,
+                "stores": self.stores, "customers": self.customers}[self.current_category]
 
     def setup_action_buttons(self, main_layout):
         """Настройка кнопок действий (по центру)"""
@@ -391,10 +454,31 @@ class BookStoreApp(QMainWindow):
         
         main_layout.addWidget(action_frame)
 
-    def show_category(self, category):
-        """Отображение выбранной категории"""
+    def run_search(self):
+        """Поиск книг по тексту из поля поиска"""
+        query = self.search_input.text().strip()
+        if not query:
+            self.show_category("books")
+            return
+        self.show_category("books", self.start_search(query))
+
+    def start_search(self, query):
+        """Результаты поиска, которые читаются в фоне и перерисовываются по готовности"""
+        return SearchSource(self.worker.submit, query, self.catalog.book_from_row,
+                            on_loaded=self.schedule_render, on_error=self.worker_error("search"))
+
+    def on_search_text_changed(self, text):
+        # Очищенное поле возвращает полный список книг
+        if not text.strip() and self.search_results is not None:
+            self.show_category("books")
+
+    def show_category(self, category, search=None):
+        """Отображение выбранной категории; search - результаты поиска книг"""
         self.current_category = category
         self.current_index = 0
+        self.search_results = search
+        if search is None and self.search_input.text():
+            self.search_input.clear()
         
         # Скрываем специальные кнопки
         self.add_to_store_btn.hide()
@@ -428,187 +512,129 @@ class BookStoreApp(QMainWindow):
         # Обновляем информацию
         self.update_info_blocks()
 
+    def schedule_render(self):
+        """Отрисовка блоков в следующем кадре; вызовы до него работы не добавляют"""
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def flush_render(self):
+        """Немедленная отрисовка, если она запланирована"""
+        if self.render_timer.isActive():
+            self.update_info_blocks()
+
+    @metrics.timed("app.update_info_blocks")
     def update_info_blocks(self):
-        """Обновление информационных блоков"""
-        logger.log_info(f"update_info_blocks called with current_index={self.current_index}, current_category={self.current_category}")
-        items = []
+        """Отрисовка блоков: текст меняется только у надписей, где он стал другим"""
+        self.render_timer.stop()
+        blocks, summary = self.build_view()
+        logger.log_debug("Отрисовка %s с позиции %s", self.current_category, self.current_index)
+        for (block, title, content), (title_text, content_text) in zip(self.info_blocks, blocks):
+            self.set_label_text(title, title_text)
+            self.set_label_text(content, content_text)
+        self.set_label_text(self.center_block_content, summary)
+
+    def set_label_text(self, label, text):
+        if self.rendered_text.get(label) != text:
+            self.rendered_text[label] = text
+            label.setText(text)
+
+    def build_view(self):
+        """Модель отображения: (заголовок, текст) пяти блоков и текст центрального блока"""
+        # Загружаем только видимое окно из пяти элементов
+        window = self.current_items().window(self.current_index, 5)
+        blocks = [self.describe_item(item) for item in window]
+        blocks += [(self.current_category.capitalize(), "Нет данных")] * (5 - len(blocks))
+        return blocks, self.describe_summary()
+
+    def describe_item(self, item):
+        """Заголовок и текст блока одного элемента текущей категории"""
         if self.current_category == "books":
-            items = self.books
-        elif self.current_category == "authors":
-            items = self.authors
-        elif self.current_category == "genres":
-            items = self.genres
-        elif self.current_category == "stores":
-            items = self.stores
-        elif self.current_category == "customers":
-            items = self.customers
-        
-        logger.log_info(f"Items count: {len(items)}")
-        # Обновляем первые 3 блока
-        for i in range(3):
-            idx = self.current_index + i
-            logger.log_info(f"Updating block {i} with idx={idx}")
-            block, title, content = self.info_blocks[i]
-            
-            if idx < len(items):
-                item = items[idx]
-                if self.current_category == "books":
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Автор: {item.author.name}\nЖанр: {item.genre.name}\nЦена: {item.price}р")
-                elif self.current_category == "authors":
-                    book_count = sum(1 for book in self.books if book.author.name == item.name)
-                    genres = set(book.genre.name for book in self.books if book.author.name == item.name)
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Книг: {book_count}\nЖанры: {', '.join(genres) if genres else 'нет'}")
-                elif self.current_category == "genres":
-                    book_count = sum(1 for book in self.books if book.genre.name == item.name)
-                    authors = set(book.author.name for book in self.books if book.genre.name == item.name)
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Книг: {book_count}\nАвторы: {', '.join(authors) if authors else 'нет'}")
-                elif self.current_category == "stores":
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Книг: {len(item.library)}")
-                elif self.current_category == "customers":
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText("Информация о покупках")
-            else:
-                title.setText(self.current_category.capitalize())
-                title.setAlignment(Qt.AlignCenter)
-                content.setText("Нет данных")
-        
-        # Обновляем левый и правый блоки (4 и 5 элементы)
-        for i in range(2):
-            idx = self.current_index + 3 + i
-            logger.log_info(f"Updating side block {i} with idx={idx}")
-            block, title, content = self.info_blocks[3 + i]
-            
-            if idx < len(items):
-                item = items[idx]
-                if self.current_category == "books":
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Автор: {item.author.name}\nЖанр: {item.genre.name}\nЦена: {item.price}р")
-                elif self.current_category == "authors":
-                    book_count = sum(1 for book in self.books if book.author.name == item.name)
-                    genres = set(book.genre.name for book in self.books if book.author.name == item.name)
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Книг: {book_count}\nЖанры: {', '.join(genres) if genres else 'нет'}")
-                elif self.current_category == "genres":
-                    book_count = sum(1 for book in self.books if book.genre.name == item.name)
-                    authors = set(book.author.name for book in self.books if book.genre.name == item.name)
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Книг: {book_count}\nАвторы: {', '.join(authors) if authors else 'нет'}")
-                elif self.current_category == "stores":
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText(f"Книг: {len(item.library)}")
-                elif self.current_category == "customers":
-                    title.setText(item.name)
-                    title.setAlignment(Qt.AlignCenter)
-                    content.setText("Информация о покупках")
-            else:
-                title.setText(self.current_category.capitalize())
-                title.setAlignment(Qt.AlignCenter)
-                content.setText("Нет данных")
-        
-        # Обновляем центральный блок с общей информацией
+            return item.name, f"Автор: {item.author.name}\nЖанр: {item.genre.name}\nЦена: {item.price}р"
+        if self.current_category == "authors":
+            book_count, genres = self.catalog.aggregates.author_summary(item.name)
+            return item.name, f"Книг: {book_count}\nЖанры: {', '.join(genres) if genres else 'нет'}"
+        if self.current_category == "genres":
+            book_count, authors = self.catalog.aggregates.genre_summary(item.name)
+            return item.name, f"Книг: {book_count}\nАвторы: {', '.join(authors) if authors else 'нет'}"
+        if self.current_category == "stores":
+            return item.name, f"Книг: {len(item.library)}"
+        return item.name, "Информация о покупках"
+
+    def describe_summary(self):
+        """Текст центрального блока с общей информацией"""
+        if self.current_category == "books" and self.search_results is not None:
+            if not self.search_results.loaded:
+                return f"Поиск: {self.search_results.query}\nИдёт поиск..."
+            found = len(self.search_results)
+            if self.search_results.more:
+                found = f"{database.SEARCH_RANK_LIMIT}+"
+            return f"Поиск: {self.search_results.query}\nНайдено книг: {found}"
         if self.current_category == "books":
-            avg_price = sum(book.price for book in self.books) / len(self.books) if self.books else 0
-            self.center_block_content.setText(f"Всего книг: {len(self.books)}\nСредняя цена: {avg_price:.2f}р")
-        elif self.current_category == "authors":
+            prices = self.catalog.price_stats()
+            if not prices.count:
+                return f"Всего книг: {len(self.books)}\nСредняя цена: 0.00р"
+            return (f"Всего книг: {len(self.books)}\nСредняя цена: {prices.mean:.2f}р\n"
+                    f"Мин/макс: {prices.minimum:.2f}р / {prices.maximum:.2f}р\n"
+                    f"Отклонение: {prices.stddev:.2f}р")
+        if self.current_category == "authors":
             avg_books = len(self.books) / len(self.authors) if self.authors else 0
-            self.center_block_content.setText(f"Всего авторов: {len(self.authors)}\nСреднее книг на автора: {avg_books:.1f}")
-        elif self.current_category == "genres":
+            return f"Всего авторов: {len(self.authors)}\nСреднее книг на автора: {avg_books:.1f}"
+        if self.current_category == "genres":
             avg_books = len(self.books) / len(self.genres) if self.genres else 0
-            self.center_block_content.setText(f"Всего жанров: {len(self.genres)}\nСреднее книг на жанр: {avg_books:.1f}")
-        elif self.current_category == "stores":
-            total_books = sum(len(store.library) for store in self.stores)
-            self.center_block_content.setText(f"Всего магазинов: {len(self.stores)}\nВсего книг в магазинах: {total_books}")
-        elif self.current_category == "customers":
-            self.center_block_content.setText(f"Всего покупателей: {len(self.customers)}")
+            return f"Всего жанров: {len(self.genres)}\nСреднее книг на жанр: {avg_books:.1f}"
+        if self.current_category == "stores":
+            return (f"Всего магазинов: {len(self.stores)}\n"
+                    f"Всего книг в магазинах: {self.catalog.store_links}")
+        return f"Всего покупателей: {len(self.customers)}"
+
+    def show_entity_form(self, kind, on_submit):
+        """Форма добавления из forms.ENTITY_FORMS; диалог строится один раз и переиспользуется"""
+        import forms
+        
+        if self.dialogs is None:
+            self.dialogs = forms.DialogPool()
+        dialog = self.dialogs.get(kind, lambda: forms.EntityForm(
+            forms.ENTITY_FORMS[kind], self.conn, on_submit, parent=self))
+        dialog.open_form()
 
     def show_add_book_dialog(self):
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Добавить книгу")
-        dialog.setFixedSize(400, 250)
-        
-        layout = QVBoxLayout(dialog)
-        
-        title_label = QLabel("# Добавить книгу")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        layout.addWidget(title_label)
-        
-        form = QFormLayout()
-        
-        title_input = QLineEdit()
-        form.addRow("Название:", title_input)
-        
-        author_input = QComboBox()
-        author_input.addItems([a.name for a in self.authors])
-        form.addRow("Автор:", author_input)
-        
-        genre_input = QComboBox()
-        genre_input.addItems([g.name for g in self.genres])
-        form.addRow("Жанр:", genre_input)
-        
-        price_input = QLineEdit()
-        price_input.setValidator(QDoubleValidator())
-        form.addRow("Цена:", price_input)
-        
-        layout.addLayout(form)
-        
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(lambda: self.add_new_book(
-            title_input.text(),
-            author_input.currentText(),
-            genre_input.currentText(),
-            price_input.text(),
-            dialog
-        ))
-        buttons.rejected.connect(dialog.reject)
-        layout.addWidget(buttons)
-        
-        dialog.exec_()
+        self.show_entity_form("book", self.add_new_book)
 
     def add_new_book(self, title, author_name, genre_name, price_str, dialog):
+        if not all([title, author_name, genre_name, price_str]):
+            QMessageBox.warning(self, "Ошибка", "Все поля должны быть заполнены")
+            return
         try:
-            if not all([title, author_name, genre_name, price_str]):
-                QMessageBox.warning(self, "Ошибка", "Все поля должны быть заполнены")
-                return
-            
             price = float(price_str)
-            
-            if author_name not in [a.name for a in self.authors]:
-                if database.add_author(self.conn, author_name):
-                    self.authors.append(Author(author_name))
-            
-            if genre_name not in [g.name for g in self.genres]:
-                if database.add_genre(self.conn, genre_name):
-                    self.genres.append(Genre(genre_name))
-            
-            if database.add_book(self.conn, title, author_name, genre_name, price):
-                new_book = Book(title, Author(author_name), Genre(genre_name), price)
-                self.books.append(new_book)
-                self.update_info_blocks()
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Введите корректную цену")
+            return
+        started = time.perf_counter()
+        
+        def done(result):
+            _, _, book_row = result
+            self.poll_changes()
+            elapsed = time.perf_counter() - started
+            metrics.record("app.add_new_book", elapsed)
+            if book_row:
+                # Автор и жанр могли совпасть с существующими без учёта регистра:
+                # в каталог попадают имена в том виде, как они хранятся в базе
+                new_book = self.catalog.book_from_row(book_row)
+                logger.log_operation("add_book", new_book, elapsed)
                 QMessageBox.information(self, "Успех", "Книга успешно добавлена")
                 dialog.accept()
             else:
+                logger.log_error("Не удалось добавить книгу %s", title, operation="add_book")
                 QMessageBox.warning(self, "Ошибка", "Не удалось добавить книгу")
-                
-        except ValueError:
-            QMessageBox.warning(self, "Ошибка", "Введите корректную цену")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {str(e)}")
+        
+        # Автор, жанр и книга записываются одной транзакцией в фоновом потоке
+        self.worker.submit(database.add_book_with_names, title, author_name, genre_name, price,
+                           on_result=done, on_error=self.worker_error("add_book"), write=True)
 
     def show_add_to_store_dialog(self):
         """Диалог добавления книги в магазин"""
+        import models
+        
         if not self.books or not self.stores:
             QMessageBox.warning(self, "Ошибка", "Нет доступных книг или магазинов")
             return
@@ -620,56 +646,17 @@ class BookStoreApp(QMainWindow):
         layout = QVBoxLayout(dialog)
         
         title_label = QLabel("# Добавить книгу в библиотеку")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
+        title_label.setObjectName(styles.DIALOG_TITLE)
         layout.addWidget(title_label)
         
         form = QFormLayout()
         
-        book_combo = QComboBox()
-        # Remove icon setting, just add items
-        book_combo.clear()
-        for b in self.books:
-            book_combo.addItem(b.name)
-        # Add custom style sheet for green dropdown arrow
-        book_combo.setStyleSheet("""
-            QComboBox::drop-down {
-                subcontrol-origin: padding;
-                subcontrol-position: top right;
-                width: 20px;
-                border-left-width: 1px;
-                border-left-color: darkgray;
-                border-left-style: solid;
-                border-top-right-radius: 3px;
-                border-bottom-right-radius: 3px;
-            }
-            QComboBox::down-arrow {
-                image: url(icons/green_down_arrow.png);
-                width: 18px;
-                height: 18px;
-            }
-        """)
+        book_combo = models.setup_lookup_combo(QComboBox(), self.conn, "books")
+        book_combo.setObjectName(styles.ARROW_COMBO)  # Зелёная стрелка списка
         form.addRow("Название книги:", book_combo)
         
-        store_combo = QComboBox()
-        store_combo.addItems([s.name for s in self.stores])
-        # Add same style sheet for green dropdown arrow
-        store_combo.setStyleSheet("""
-            QComboBox::drop-down {
-                subcontrol-origin: padding;
-                subcontrol-position: top right;
-                width: 20px;
-                border-left-width: 1px;
-                border-left-color: darkgray;
-                border-left-style: solid;
-                border-top-right-radius: 3px;
-                border-bottom-right-radius: 3px;
-            }
-            QComboBox::down-arrow {
-                image: url(icons/green_down_arrow.png);
-                width: 18px;
-                height: 18px;
-            }
-        """)
+        store_combo = models.setup_lookup_combo(QComboBox(), self.conn, "stores")
+        store_combo.setObjectName(styles.ARROW_COMBO)  # Зелёная стрелка списка
         form.addRow("Название магазина:", store_combo)
         
         layout.addLayout(form)
@@ -687,25 +674,33 @@ class BookStoreApp(QMainWindow):
 
     def add_book_to_store(self, book_title, store_name, dialog):
         """Добавление книги в магазин"""
-        try:
-            book = next((b for b in self.books if b.name == book_title), None)
-            store = next((s for s in self.stores if s.name == store_name), None)
-            
-            if book and store:
-                if database.add_book_to_store(self.conn, store.name, book.name):
-                    store.add_book(book)
-                    self.update_info_blocks()
-                    QMessageBox.information(self, "Успех", "Книга добавлена в магазин")
-                    dialog.accept()
-                else:
-                    QMessageBox.warning(self, "Ошибка", "Не удалось добавить книгу в магазин")
+        started = time.perf_counter()
+        book = self.catalog.get_book(book_title)
+        store = self.catalog.get_store(store_name)
+        if not (book and store):
+            QMessageBox.warning(self, "Ошибка", "Книга или магазин не найдены")
+            return
+        
+        def done(added):
+            self.poll_changes()
+            elapsed = time.perf_counter() - started
+            metrics.record("app.add_book_to_store", elapsed)
+            if added:
+                logger.log_operation("add_book_to_store", store, elapsed)
+                QMessageBox.information(self, "Успех", "Книга добавлена в магазин")
+                dialog.accept()
             else:
-                QMessageBox.warning(self, "Ошибка", "Книга или магазин не найдены")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {str(e)}")
+                logger.log_error("Не удалось добавить книгу %s в магазин %s", book_title,
+                                 store_name, operation="add_book_to_store")
+                QMessageBox.warning(self, "Ошибка", "Не удалось добавить книгу в магазин")
+        
+        self.worker.submit(database.add_book_to_store, store.name, book.name, on_result=done,
+                           on_error=self.worker_error("add_book_to_store"), write=True)
 
     def show_store_books_dialog(self):
         """Диалог просмотра книг в магазине"""
+        import models
+        
         if not self.stores:
             QMessageBox.warning(self, "Ошибка", "Нет доступных магазинов")
             return
@@ -716,202 +711,141 @@ class BookStoreApp(QMainWindow):
         
         layout = QVBoxLayout(dialog)
         
-        store_combo = QComboBox()
-        store_combo.addItems([s.name for s in self.stores])
-        # Add custom style sheet for green dropdown arrow
-        store_combo.setStyleSheet("""
-            QComboBox::drop-down {
-                subcontrol-origin: padding;
-                subcontrol-position: top right;
-                width: 20px;
-                border-left-width: 1px;
-                border-left-color: darkgray;
-                border-left-style: solid;
-                border-top-right-radius: 3px;
-                border-bottom-right-radius: 3px;
-            }
-            QComboBox::down-arrow {
-                image: url(icons/green_down_arrow.png);
-                width: 18px;
-                height: 18px;
-            }
-        """)
+        store_combo = models.setup_lookup_combo(QComboBox(), self.conn, "stores")
+        store_combo.setObjectName(styles.ARROW_COMBO)  # Зелёная стрелка списка
         layout.addWidget(store_combo)
         
-        books_list = QListWidget()
+        # Книги магазина читаются порциями по мере прокрутки списка
+        books_list = QListView()
+        books_model = models.StoreBooksModel(self.conn, store_combo.currentText(), parent=books_list)
+        books_list.setModel(books_model)
         layout.addWidget(books_list)
         
-        def update_books_list():
-            store_name = store_combo.currentText()
-            store = next((s for s in self.stores if s.name == store_name), None)
-            books_list.clear()
-            if store and store.library:
-                for book in store.library:
-                    books_list.addItem(f"{book.name} ({book.author.name})")
-        
-        store_combo.currentTextChanged.connect(update_books_list)
-        update_books_list()
+        store_combo.currentTextChanged.connect(books_model.set_store)
         
         dialog.exec_()
 
     def show_add_author_dialog(self):
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Добавить автора")
-        dialog.setFixedSize(300, 150)
-        
-        layout = QVBoxLayout(dialog)
-        
-        title_label = QLabel("# Добавить автора")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        layout.addWidget(title_label)
-        
-        form = QFormLayout()
-        
-        name_input = QLineEdit()
-        form.addRow("Имя автора:", name_input)
-        
-        layout.addLayout(form)
-        
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(lambda: self.add_new_author(name_input.text(), dialog))
-        buttons.rejected.connect(dialog.reject)
-        layout.addWidget(buttons)
-        
-        dialog.exec_()
+        self.show_entity_form("author", self.add_new_author)
 
     def add_new_author(self, name, dialog):
         if not name:
             QMessageBox.warning(self, "Ошибка", "Введите имя автора")
             return
         
-        if database.add_author(self.conn, name):
-            self.authors.append(Author(name))
-            self.update_info_blocks()
-            QMessageBox.information(self, "Успех", "Автор успешно добавлен")
-            dialog.accept()
-        else:
-            QMessageBox.warning(self, "Ошибка", "Не удалось добавить автора")
-
-    def show_add_genre_dialog(self):
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Добавить жанр")
-        dialog.setFixedSize(300, 150)
+        started = time.perf_counter()
         
-        layout = QVBoxLayout(dialog)
-        
-        title_label = QLabel("# Добавить жанр")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        layout.addWidget(title_label)
-        
-        form = QFormLayout()
-        
-        name_input = QLineEdit()
-        form.addRow("Название жанра:", name_input)
-        
-        layout.addLayout(form)
-        
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(lambda: self.add_new_genre(name_input.text(), dialog))
-        buttons.rejected.connect(dialog.reject)
-        layout.addWidget(buttons)
+        def done(added):
+            self.poll_changes()
+            elapsed = time.perf_counter() - started
+            metrics.record("app.add_new_author", elapsed)
+            if added:
+                logger.log_operation("add_author", Author(name), elapsed)
+                QMessageBox.information(self, "Успех", "Автор успешно добавлен")
+                dialog.accept()
+            else:
+                logger.log_error("Не удалось добавить автора: %s", name, operation="add_author")
+                QMessageBox.warning(self, "Ошибка", "Не удалось добавить автора")
         
-        dialog.exec_()
+        self.worker.submit(database.add_author, name, on_result=done,
+                           on_error=self.worker_error("add_author"), write=True)
+
+    def show_add_genre_dialog(self):
+        self.show_entity_form("genre", self.add_new_genre)
 
     def add_new_genre(self, name, dialog):
         if not name:
             QMessageBox.warning(self, "Ошибка", "Введите название жанра")
             return
         
-        if database.add_genre(self.conn, name):
-            self.genres.append(Genre(name))
-            self.update_info_blocks()
-            QMessageBox.information(self, "Успех", "Жанр успешно добавлен")
-            dialog.accept()
-        else:
-            QMessageBox.warning(self, "Ошибка", "Не удалось добавить жанр")
-
-    def show_add_store_dialog(self):
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Добавить магазин")
-        dialog.setFixedSize(300, 150)
+        started = time.perf_counter()
         
-        layout = QVBoxLayout(dialog)
-        
-        title_label = QLabel("# Добавить магазин")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        layout.addWidget(title_label)
-        
-        form = QFormLayout()
-        
-        name_input = QLineEdit()
-        form.addRow("Название магазина:", name_input)
-        
-        layout.addLayout(form)
-        
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(lambda: self.add_new_store(name_input.text(), dialog))
-        buttons.rejected.connect(dialog.reject)
-        layout.addWidget(buttons)
+        def done(added):
+            self.poll_changes()
+            elapsed = time.perf_counter() - started
+            metrics.record("app.add_new_genre", elapsed)
+            if added:
+                logger.log_operation("add_genre", Genre(name), elapsed)
+                QMessageBox.information(self, "Успех", "Жанр успешно добавлен")
+                dialog.accept()
+            else:
+                logger.log_error("Не удалось добавить жанр: %s", name, operation="add_genre")
+                QMessageBox.warning(self, "Ошибка", "Не удалось добавить жанр")
         
-        dialog.exec_()
+        self.worker.submit(database.add_genre, name, on_result=done,
+                           on_error=self.worker_error("add_genre"), write=True)
+
+    def show_add_store_dialog(self):
+        self.show_entity_form("store", self.add_new_store)
 
     def add_new_store(self, name, dialog):
         if not name:
             QMessageBox.warning(self, "Ошибка", "Введите название магазина")
             return
         
-        if database.add_store(self.conn, name):
-            self.stores.append(Store(name))
-            self.update_info_blocks()
-            QMessageBox.information(self, "Успех", "Магазин успешно добавлен")
-            dialog.accept()
-        else:
-            QMessageBox.warning(self, "Ошибка", "Не удалось добавить магазин")
-
-    def show_add_customer_dialog(self):
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Добавить покупателя")
-        dialog.setFixedSize(300, 150)
-        
-        layout = QVBoxLayout(dialog)
-        
-        title_label = QLabel("# Добавить покупателя")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        layout.addWidget(title_label)
-        
-        form = QFormLayout()
-        
-        name_input = QLineEdit()
-        form.addRow("Имя покупателя:", name_input)
+        started = time.perf_counter()
         
-        layout.addLayout(form)
-        
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(lambda: self.add_new_customer(name_input.text(), dialog))
-        buttons.rejected.connect(dialog.reject)
-        layout.addWidget(buttons)
+        def done(added):
+            self.poll_changes()
+            elapsed = time.perf_counter() - started
+            metrics.record("app.add_new_store", elapsed)
+            if added:
+                logger.log_operation("add_store", Store(name), elapsed)
+                QMessageBox.information(self, "Успех", "Магазин успешно добавлен")
+                dialog.accept()
+            else:
+                logger.log_error("Не удалось добавить магазин: %s", name, operation="add_store")
+                QMessageBox.warning(self, "Ошибка", "Не удалось добавить магазин")
         
-        dialog.exec_()
+        self.worker.submit(database.add_store, name, on_result=done,
+                           on_error=self.worker_error("add_store"), write=True)
+
+    def show_add_customer_dialog(self):
+        self.show_entity_form("customer", self.add_new_customer)
 
     def add_new_customer(self, name, dialog):
         if not name:
             QMessageBox.warning(self, "Ошибка", "Введите имя покупателя")
             return
         
-        if database.add_customer(self.conn, name):
-            self.customers.append(Customer(name))
-            self.update_info_blocks()
-            QMessageBox.information(self, "Успех", "Покупатель успешно добавлен")
-            dialog.accept()
-        else:
-            QMessageBox.warning(self, "Ошибка", "Не удалось добавить покупателя")
+        started = time.perf_counter()
+        
+        def done(added):
+            self.poll_changes()
+            elapsed = time.perf_counter() - started
+            metrics.record("app.add_new_customer", elapsed)
+            if added:
+                logger.log_operation("add_customer", Customer(name), elapsed)
+                QMessageBox.information(self, "Успех", "Покупатель успешно добавлен")
+                dialog.accept()
+            else:
+                logger.log_error("Не удалось добавить покупателя: %s", name, operation="add_customer")
+                QMessageBox.warning(self, "Ошибка", "Не удалось добавить покупателя")
+        
+        self.worker.submit(database.add_customer, name, on_result=done,
+                           on_error=self.worker_error("add_customer"), write=True)
+
+    def dump_metrics(self):
+        """Вывод отчёта о замерах в консоль и журнал"""
+        report = metrics.registry.report()
+        print(report)
+        logger.log_info("Отчёт о замерах:\n%s", report)
 
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
+        self.change_timer.stop()
+        self.worker.close()
         self.conn.close()
         event.accept()
 
 if __name__ == "__main__":
+    # --profile-startup: печать времени по фазам запуска вместо работы окна
+    profile = None
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profile = metrics.StartupProfile(_STARTED)
+        profile.mark("импорт модулей")
+    
     # Убедимся, что используем правильный API
     if hasattr(Qt, 'AA_EnableHighDpiScaling'):
         QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
@@ -920,10 +854,21 @@ if __name__ == "__main__":
     
     app = QApplication(sys.argv)
     os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = QLibraryInfo.location(QLibraryInfo.PluginsPath)
+    if profile is not None:
+        profile.mark("QApplication")
     
     try:
-        window = BookStoreApp()
+        window = BookStoreApp(profile=profile)
         window.show()
+        if profile is not None:
+            app.processEvents()
+            window.mark_startup("показ окна")
+            window.worker.wait_for_done()
+            app.processEvents()
+            window.mark_startup("отрисовка данных")
+            print(profile.report())
+            window.close()
+            sys.exit(0)
         sys.exit(app.exec_())
     except Exception as e:
         QMessageBox.critical(None, "Ошибка", f"Не удалось запустить приложение: {str(e)}")
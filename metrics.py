@@ -0,0 +1,215 @@
+# metrics.py
+"""Замеры времени горячих участков кода.
+
+Декоратор timed и контекстный менеджер timer записывают число вызовов и
+гистограмму длительностей в общий реестр registry. Замеры включаются
+переменной окружения BOOKSTORE_METRICS=1 (или registry.enable()); пока они
+выключены, обёртка только проверяет флаг и вызывает исходную функцию.
+
+Отчёт печатается при выходе из программы, если замеры включены, и по
+запросу через registry.report() (в окне приложения - Ctrl+Shift+M).
+StartupProfile собирает разбивку запуска по фазам (main.py --profile-startup).
+"""
+import atexit
+import functools
+import math
+import os
+import sys
+import threading
+import time
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей (мс) с корзинами, растущими в growth раз.
+
+    Память постоянна; перцентиль возвращается с точностью до ширины
+    корзины (около 5%).
+    """
+
+    def __init__(self, minimum=0.001, growth=1.05, buckets=512):
+        self.minimum = minimum
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.minimum:
+            index = 0
+        else:
+            index = int(math.log(value / self.minimum) / self._log_growth) + 1
+            index = min(index, len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попадает заданная доля значений"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.minimum * self.growth ** index, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class MetricsRegistry:
+    """Гистограммы длительностей по именам замеров"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.add(seconds * 1000)
+
+    def snapshot(self):
+        """{имя: (вызовов, всего мс, среднее, p50, p95, p99, макс)}"""
+        with self._lock:
+            return {
+                name: (h.count, h.total, h.mean(), h.percentile(0.50),
+                       h.percentile(0.95), h.percentile(0.99), h.max)
+                for name, h in self._histograms.items()
+            }
+
+    def report(self):
+        """Текстовый отчёт, самые затратные по суммарному времени сверху"""
+        if not self.enabled and not self._histograms:
+            return "Замеры выключены (BOOKSTORE_METRICS=1)"
+        rows = sorted(self.snapshot().items(), key=lambda item: -item[1][1])
+        lines = [f"{'замер':<36} {'вызовов':>8} {'всего, мс':>11} {'сред., мс':>10} "
+                 f"{'p50':>9} {'p95':>9} {'p99':>9} {'макс':>9}"]
+        for name, (count, total, mean, p50, p95, p99, peak) in rows:
+            lines.append(f"{name:<36} {count:>8} {total:>11.3f} {mean:>10.3f} "
+                         f"{p50:>9.3f} {p95:>9.3f} {p99:>9.3f} {peak:>9.3f}")
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry(enabled=os.environ.get("BOOKSTORE_METRICS") == "1")
+
+
+class _Timer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def record(name, seconds):
+    """Замер, посчитанный вызывающим кодом (например, от отправки задачи до ответа)"""
+    if registry.enabled:
+        registry.record(name, seconds)
+
+
+def timer(name):
+    """Контекстный менеджер: with timer("загрузка"): ..."""
+    return _Timer(name) if registry.enabled else _NULL_TIMER
+
+
+def timed(name=None):
+    """Декоратор замера функции; по умолчанию имя - module.qualname"""
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.record(label, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def instrument_module(namespace, prefix, exclude=()):
+    """Оборачивает в timed все функции, объявленные в модуле.
+
+    Вызывается в конце модуля: instrument_module(globals(), "database").
+    Импортированные функции не трогаются.
+    """
+    module = namespace["__name__"]
+    for attr, value in list(namespace.items()):
+        if (callable(value) and getattr(value, "__module__", None) == module
+                and not isinstance(value, type) and not attr.startswith("_")
+                and attr not in exclude):
+            namespace[attr] = timed(f"{prefix}.{attr}")(value)
+
+
+class StartupProfile:
+    """Последовательные фазы запуска: mark(фаза) закрывает фазу, начатую
+    предыдущей отметкой (первая - с момента started)"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self):
+        lines = [f"{'Фаза запуска':<36} {'мс':>9} {'доля':>7}"]
+        total = sum(duration for _, duration in self.phases)
+        for phase, duration in self.phases:
+            share = duration / total if total else 0.0
+            lines.append(f"{phase:<36} {duration:>9.1f} {share:>7.1%}")
+        lines.append(f"{'Итого':<36} {total:>9.1f}")
+        return "\n".join(lines)
+
+
+def _report_at_exit():
+    if registry.enabled:
+        print(registry.report(), file=sys.stderr)
+
+
+atexit.register(_report_at_exit)
@@ -0,0 +1,391 @@
+# migrations.py
+"""Версионированные миграции схемы базы данных.
+
+Номер применённой миграции хранится в PRAGMA user_version. При запуске
+migrate() применяет по порядку только недостающие миграции, каждую в
+своей транзакции вместе с обновлением user_version. Новая миграция
+добавляется функцией в конец списка MIGRATIONS; менять уже выпущенные
+миграции нельзя.
+
+Запуск: python migrations.py [books.db] [--check]
+"""
+import sys
+
+import connection
+from names import normalize_name
+from transactions import transaction
+
+
+def _create_baseline(c):
+    """1: исходная схема (таблицы, которые раньше создавала create_tables)"""
+    c.execute("""CREATE TABLE IF NOT EXISTS books (
+                title text PRIMARY KEY,
+                author text,
+                genre text,
+                price real
+                )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS authors (
+                name text PRIMARY KEY
+                )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS genres (
+                name text PRIMARY KEY
+                )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS customers (
+                name text PRIMARY KEY
+                )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS stores (
+                name text PRIMARY KEY
+                )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS store_books (
+                store_name text,
+                book_title text,
+                PRIMARY KEY (store_name, book_title),
+                FOREIGN KEY (store_name) REFERENCES stores(name),
+                FOREIGN KEY (book_title) REFERENCES books(title)
+                )""")
+
+
+def _add_lookup_indexes(c):
+    """2: индексы для выборок книг по автору и жанру и связей по книге"""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_author_genre ON books(author, genre)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_genre_author ON books(genre, author)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_store_books_book ON store_books(book_title)")
+
+
+def _cascade_store_links(c):
+    """3: каскадное удаление связей магазин-книга и очистка висячих связей.
+
+    Нужна для включённой проверки внешних ключей (PRAGMA foreign_keys):
+    без ON DELETE CASCADE удаление книги или магазина со связями падало бы.
+    """
+    c.execute("""CREATE TABLE store_books_new (
+                store_name text,
+                book_title text,
+                PRIMARY KEY (store_name, book_title),
+                FOREIGN KEY (store_name) REFERENCES stores(name) ON DELETE CASCADE,
+                FOREIGN KEY (book_title) REFERENCES books(title) ON DELETE CASCADE
+                ) WITHOUT ROWID""")
+    c.execute("""INSERT INTO store_books_new
+                SELECT store_name, book_title FROM store_books sb
+                WHERE EXISTS (SELECT 1 FROM stores s WHERE s.name = sb.store_name)
+                  AND EXISTS (SELECT 1 FROM books b WHERE b.title = sb.book_title)""")
+    c.execute("DROP TABLE store_books")
+    c.execute("ALTER TABLE store_books_new RENAME TO store_books")
+    c.execute("CREATE INDEX idx_store_books_book ON store_books(book_title)")
+
+
+def _normalize_keys(c):
+    """4: целочисленные ключи вместо текстовых.
+
+    Книги ссылаются на авторов и жанры, а связи магазин-книга на магазины
+    и книги по INTEGER PRIMARY KEY. Идентификаторы берутся из старых rowid,
+    поэтому порядок записей сохраняется. Авторы и жанры, которые
+    встречались только в книгах, добавляются в свои таблицы.
+    Старые таблицы сначала переименовываются (внешние ключи связей
+    переименовываются вместе с ними), затем удаляются.
+    """
+    for table in ("store_books", "books", "authors", "genres", "stores", "customers"):
+        c.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+
+    for table in ("authors", "genres", "stores", "customers"):
+        c.execute(f"""CREATE TABLE {table} (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                    )""")
+    c.execute("""CREATE TABLE books (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL UNIQUE,
+                author_id INTEGER REFERENCES authors(id),
+                genre_id INTEGER REFERENCES genres(id),
+                price REAL
+                )""")
+    c.execute("""CREATE TABLE store_books (
+                store_id INTEGER NOT NULL REFERENCES stores(id) ON DELETE CASCADE,
+                book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+                PRIMARY KEY (store_id, book_id)
+                ) WITHOUT ROWID""")
+
+    for table in ("authors", "genres", "stores", "customers"):
+        c.execute(f"""INSERT INTO {table} (id, name)
+                    SELECT rowid, name FROM {table}_old WHERE name IS NOT NULL""")
+    c.execute("""INSERT OR IGNORE INTO authors (name)
+                SELECT DISTINCT author FROM books_old WHERE author IS NOT NULL""")
+    c.execute("""INSERT OR IGNORE INTO genres (name)
+                SELECT DISTINCT genre FROM books_old WHERE genre IS NOT NULL""")
+    c.execute("""INSERT INTO books (id, title, author_id, genre_id, price)
+                SELECT b.rowid, b.title, a.id, g.id, b.price FROM books_old b
+                LEFT JOIN authors a ON a.name = b.author
+                LEFT JOIN genres g ON g.name = b.genre
+                WHERE b.title IS NOT NULL""")
+    c.execute("""INSERT INTO store_books (store_id, book_id)
+                SELECT s.id, b.id FROM store_books_old sb
+                JOIN stores s ON s.name = sb.store_name
+                JOIN books b ON b.title = sb.book_title""")
+
+    for table in ("store_books", "books", "authors", "genres", "stores", "customers"):
+        c.execute(f"DROP TABLE {table}_old")
+
+    c.execute("CREATE INDEX idx_books_author_genre ON books(author_id, genre_id)")
+    c.execute("CREATE INDEX idx_books_genre ON books(genre_id)")
+    c.execute("CREATE INDEX idx_store_books_book ON store_books(book_id)")
+
+
+def _fold_yo(expr):
+    """SQL-выражение: expr с заменой ё на е (токенизатор FTS5 их не отождествляет)"""
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _book_search_row(book):
+    """Значения строки books_fts для книги book (new или old в триггере)"""
+    return f"""{book}.id, {_fold_yo(f"{book}.title")},
+               {_fold_yo(f"(SELECT name FROM authors WHERE id = {book}.author_id)")},
+               {_fold_yo(f"(SELECT name FROM genres WHERE id = {book}.genre_id)")}"""
+
+
+def _add_book_search(c):
+    """5: полнотекстовый индекс FTS5 по названию, автору и жанру книг.
+
+    Индекс хранит свою копию текста (имена авторов и жанров в books нет)
+    и обновляется триггерами на books, authors и genres. Префиксные
+    индексы на 2 и 3 символа ускоряют поиск по началу слова; ранг bm25
+    ценит совпадение в названии выше, чем в имени автора и жанре.
+    """
+    c.execute("""CREATE VIRTUAL TABLE books_fts USING fts5(
+                title, author, genre,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+                )""")
+    c.execute("INSERT INTO books_fts (books_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')")
+    c.execute(f"""INSERT INTO books_fts (rowid, title, author, genre)
+                SELECT {_book_search_row("b")} FROM books b""")
+    c.execute(f"""CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+                INSERT INTO books_fts (rowid, title, author, genre)
+                VALUES ({_book_search_row("new")});
+                END""")
+    c.execute("""CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+                DELETE FROM books_fts WHERE rowid = old.id;
+                END""")
+    c.execute(f"""CREATE TRIGGER books_fts_update
+                AFTER UPDATE OF id, title, author_id, genre_id ON books BEGIN
+                DELETE FROM books_fts WHERE rowid = old.id;
+                INSERT INTO books_fts (rowid, title, author, genre)
+                VALUES ({_book_search_row("new")});
+                END""")
+    for table, column, key in (("authors", "author", "author_id"), ("genres", "genre", "genre_id")):
+        c.execute(f"""CREATE TRIGGER {table}_fts_rename AFTER UPDATE OF name ON {table} BEGIN
+                    UPDATE books_fts SET {column} = {_fold_yo("new.name")}
+                    WHERE rowid IN (SELECT id FROM books WHERE {key} = new.id);
+                    END""")
+
+
+# Таблицы с именами: (таблица, столбец имени)
+NAMED_TABLES = (
+    ("authors", "name"),
+    ("genres", "name"),
+    ("stores", "name"),
+    ("customers", "name"),
+    ("books", "title"),
+)
+
+
+def _add_normalized_names(c):
+    """6: столбец norm_name (names.normalize_name) с уникальным индексом.
+
+    Значения считаются в Python по порядку id. Если ключи двух уже
+    существующих строк совпадают (например, 'Стивен' и 'стивен'), то
+    более поздняя строка получает ключ с суффиксом '#id' и остаётся
+    отдельной записью.
+    """
+    for table, column in NAMED_TABLES:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN norm_name TEXT")
+        seen = set()
+        keys = []
+        for row_id, name in c.execute(f"SELECT id, {column} FROM {table} ORDER BY id").fetchall():
+            key = normalize_name(name)
+            if key in seen:
+                key = f"{key}#{row_id}"
+            seen.add(key)
+            keys.append((key, row_id))
+        c.executemany(f"UPDATE {table} SET norm_name = ? WHERE id = ?", keys)
+        c.execute(f"CREATE UNIQUE INDEX idx_{table}_norm_name ON {table}(norm_name)")
+
+
+def _book_change(row):
+    """JSON строки книги для журнала: имена автора и жанра вместо id"""
+    return f"""json_object('title', {row}.title,
+                'author', (SELECT name FROM authors WHERE id = {row}.author_id),
+                'genre', (SELECT name FROM genres WHERE id = {row}.genre_id),
+                'price', {row}.price)"""
+
+
+def _link_change(row):
+    """JSON связи магазин-книга; при каскадном удалении имя или название уже NULL"""
+    return f"""json_object('store', (SELECT name FROM stores WHERE id = {row}.store_id),
+                'title', (SELECT title FROM books WHERE id = {row}.book_id))"""
+
+
+def _name_change(row):
+    return f"json_object('name', {row}.name)"
+
+
+# Таблицы журнала: (таблица, id строки, столбцы для UPDATE OF, JSON строки)
+LOGGED_TABLES = (
+    ("books", "id", "title, author_id, genre_id, price", _book_change),
+    ("authors", "id", "name", _name_change),
+    ("genres", "id", "name", _name_change),
+    ("stores", "id", "name", _name_change),
+    ("customers", "id", "name", _name_change),
+    ("store_books", "book_id", "store_id, book_id", _link_change),
+)
+
+
+def _add_change_log(c):
+    """7: журнал изменений change_log, который заполняют триггеры.
+
+    Каждая вставка (I), изменение (U) и удаление (D) в таблицах
+    LOGGED_TABLES добавляет строку со старыми и новыми значениями в JSON.
+    Другие соединения и процессы читают строки после своей последней
+    позиции и обновляют данные в памяти без полной перезагрузки
+    (changes.py). AUTOINCREMENT не даёт id повториться после очистки
+    журнала.
+    """
+    c.execute("""CREATE TABLE change_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                op TEXT NOT NULL,
+                row_id INTEGER,
+                old TEXT,
+                new TEXT
+                )""")
+    for table, key, columns, payload in LOGGED_TABLES:
+        c.execute(f"""CREATE TRIGGER {table}_log_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO change_log (table_name, op, row_id, new)
+                    VALUES ('{table}', 'I', new.{key}, {payload("new")});
+                    END""")
+        c.execute(f"""CREATE TRIGGER {table}_log_update AFTER UPDATE OF {columns} ON {table} BEGIN
+                    INSERT INTO change_log (table_name, op, row_id, old, new)
+                    VALUES ('{table}', 'U', new.{key}, {payload("old")}, {payload("new")});
+                    END""")
+        c.execute(f"""CREATE TRIGGER {table}_log_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO change_log (table_name, op, row_id, old)
+                    VALUES ('{table}', 'D', old.{key}, {payload("old")});
+                    END""")
+
+
+def _add_price_index(c):
+    """8: индекс по цене книг: границы цен читаются двумя поисками по индексу"""
+    c.execute("CREATE INDEX idx_books_price ON books(price)")
+
+
+MIGRATIONS = [
+    _create_baseline,
+    _add_lookup_indexes,
+    _cascade_store_links,
+    _normalize_keys,
+    _add_book_search,
+    _add_normalized_names,
+    _add_change_log,
+    _add_price_index,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Применение недостающих миграций; возвращает номер версии схемы.
+
+    Приложение, cli.py и api_server.py мигрируют базу при запуске и могут
+    делать это одновременно. Поэтому каждый шаг берёт блокировку записи
+    сразу (BEGIN IMMEDIATE) и под ней перечитывает user_version: шаг,
+    который уже применил другой процесс, пропускается.
+    """
+    version = get_version(conn)
+    for number in range(version + 1, LATEST_VERSION + 1):
+        with transaction(conn, immediate=True):
+            if get_version(conn) >= number:
+                continue
+            c = conn.cursor()
+            MIGRATIONS[number - 1](c)
+            c.execute(f"PRAGMA user_version = {number}")
+    return max(get_version(conn), LATEST_VERSION)
+
+
+# Частые запросы приложения, которые должны обходиться без полного сканирования
+HOT_QUERIES = {
+    "книги автора": ("SELECT title FROM books WHERE author_id = ?", (0,)),
+    "книги жанра": ("SELECT title FROM books WHERE genre_id = ?", (0,)),
+    "агрегаты автор/жанр": (
+        "SELECT author_id, genre_id, COUNT(*) FROM books GROUP BY author_id, genre_id", ()),
+    "связи книги": ("SELECT COUNT(*) FROM store_books WHERE book_id = ?", (0,)),
+    "книга по названию": ("SELECT price FROM books WHERE norm_name = ?", ("",)),
+    "автор по имени": ("SELECT id FROM authors WHERE norm_name = ?", ("",)),
+    "магазин по имени": ("SELECT name FROM stores WHERE norm_name = ?", ("",)),
+    "имена по началу": (
+        "SELECT name FROM authors WHERE norm_name >= ? AND norm_name < ? ORDER BY norm_name LIMIT 20",
+        ("", "\U0010ffff")),
+    "книги магазина порциями": (
+        """SELECT b.id, b.title FROM store_books sb JOIN books b ON b.id = sb.book_id
+           WHERE sb.store_id = ? AND sb.book_id > ? ORDER BY sb.book_id LIMIT 200""", (0, 0)),
+    "страница книг": (
+        """SELECT b.id, b.title, a.name, g.name, b.price FROM books b
+           LEFT JOIN authors a ON a.id = b.author_id
+           LEFT JOIN genres g ON g.id = b.genre_id
+           WHERE b.id > ? ORDER BY b.id LIMIT 20""", (0,)),
+    "библиотеки магазинов": (
+        """SELECT s.name, b.title FROM stores s
+           JOIN store_books sb ON sb.store_id = s.id
+           JOIN books b ON b.id = sb.book_id
+           WHERE s.name IN (?, ?) ORDER BY s.id""", ("", "")),
+    "поиск книг": (
+        """SELECT books_fts.rowid, b.title FROM books_fts
+           JOIN books b ON b.id = books_fts.rowid
+           WHERE books_fts MATCH ? ORDER BY books_fts.rank LIMIT 20""", ('"книга"*',)),
+    "границы цен": ("SELECT (SELECT MIN(price) FROM books), (SELECT MAX(price) FROM books)", ()),
+    "журнал изменений": (
+        "SELECT id, table_name, op, old, new FROM change_log WHERE id > ? ORDER BY id LIMIT 1000",
+        (0,)),
+}
+
+
+def find_full_scans(conn):
+    """Проверка планов HOT_QUERIES через EXPLAIN QUERY PLAN.
+
+    Возвращает список (название запроса, строка плана) для шагов, которые
+    читают таблицу целиком, а не через индекс. Обращения к виртуальной
+    таблице FTS5 идут через её собственный индекс и не считаются, как и
+    SCAN CONSTANT ROW (строка из одних подзапросов без таблицы).
+    """
+    problems = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            if (detail.startswith("SCAN") and "USING" not in detail
+                    and "VIRTUAL TABLE" not in detail and detail != "SCAN CONSTANT ROW"):
+                problems.append((name, detail))
+    return problems
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    check = "--check" in args
+    paths = [arg for arg in args if arg != "--check"]
+    conn = connection.connect(paths[0] if paths else connection.DB_PATH)
+    try:
+        print(f"Версия схемы: {migrate(conn)}")
+        if check:
+            problems = find_full_scans(conn)
+            for name, detail in problems:
+                print(f"Полное сканирование в запросе '{name}': {detail}")
+            if problems:
+                sys.exit(1)
+            print("Все частые запросы используют индексы")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# models.py
+"""Ленивые Qt-модели списков поверх базы данных.
+
+Модели не загружают таблицу целиком: первая порция строк читается при
+создании, следующие - через canFetchMore/fetchMore, когда представление
+(выпадающий список, QListView) прокручивается до конца. Поэтому диалог
+открывается за время одного короткого запроса при любом размере каталога.
+Подсказки при вводе берутся запросом по диапазону индекса norm_name.
+"""
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtWidgets import QComboBox, QCompleter
+
+import database
+
+
+class LazyListModel(QAbstractListModel):
+    """Строки (ключ, текст) порциями по batch_size по возрастанию ключа.
+
+    fetch(after, limit) возвращает порцию строк (ключ, текст) с ключом
+    больше after (None - с начала).
+    """
+
+    def __init__(self, fetch, batch_size=200, parent=None):
+        super().__init__(parent)
+        self.fetch = fetch
+        self.batch_size = batch_size
+        self._rows = []
+        self._exhausted = False
+        self._fetching = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self._rows[index.row()][1]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        # Представления могут запросить следующую порцию прямо из сигнала вставки
+        if parent.isValid() or self._exhausted or self._fetching:
+            return
+        self._fetching = True
+        try:
+            after = self._rows[-1][0] if self._rows else None
+            rows = self.fetch(after, self.batch_size)
+            self._exhausted = len(rows) < self.batch_size
+            if rows:
+                self.beginInsertRows(QModelIndex(), len(self._rows),
+                                     len(self._rows) + len(rows) - 1)
+                self._rows.extend(rows)
+                self.endInsertRows()
+        finally:
+            self._fetching = False
+
+    def reload(self):
+        """Сброс загруженных строк и чтение первой порции заново"""
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+
+class NameListModel(LazyListModel):
+    """Имена авторов, жанров, магазинов, покупателей или названия книг по порядку id"""
+
+    def __init__(self, conn, table, batch_size=200, parent=None):
+        super().__init__(self._fetch_names, batch_size, parent)
+        self.conn = conn
+        self.table = table
+        self.fetchMore()
+
+    def _fetch_names(self, after, limit):
+        return [(row[0], row[1]) for row in
+                database.get_page(self.conn, self.table, after=after, limit=limit)]
+
+
+class StoreBooksModel(LazyListModel):
+    """Книги одного магазина в виде 'Название (Автор)'"""
+
+    def __init__(self, conn, store_name=None, batch_size=200, parent=None):
+        super().__init__(self._fetch_books, batch_size, parent)
+        self.conn = conn
+        self.store_name = store_name
+        self._exhausted = store_name is None
+        self.fetchMore()
+
+    def set_store(self, store_name):
+        self.store_name = store_name
+        self.reload()
+
+    def _fetch_books(self, after, limit):
+        if not self.store_name:
+            return []
+        return [(book_id, f"{title} ({author})") for book_id, title, author in
+                database.get_store_books_page(self.conn, self.store_name, after, limit)]
+
+
+class PrefixCompletionModel(QAbstractListModel):
+    """Подсказки для QCompleter: первые limit имён, начинающихся с введённого текста"""
+
+    def __init__(self, conn, table, limit=20, parent=None):
+        super().__init__(parent)
+        self.conn = conn
+        self.table = table
+        self.limit = limit
+        self._names = []
+
+    def set_prefix(self, text):
+        self.beginResetModel()
+        self._names = database.find_by_prefix(self.conn, self.table, text, self.limit) if text else []
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self._names[index.row()]
+        return None
+
+
+def setup_lookup_combo(combo, conn, table):
+    """Редактируемый выпадающий список с ленивой моделью и подсказками из базы.
+
+    Список подгружается порциями при прокрутке; при вводе текста
+    QCompleter показывает совпадения по началу имени без учёта регистра
+    и различия ё/е. Подсказки уже отфильтрованы запросом, поэтому
+    completer показывает их без собственной фильтрации.
+    """
+    combo.setEditable(True)
+    combo.setInsertPolicy(QComboBox.NoInsert)
+
+    # Completer заменяется до установки модели: стандартный completer
+    # выпадающего списка фильтрует модель сам и выбрал бы её целиком
+    completion_model = PrefixCompletionModel(conn, table, parent=combo)
+    completer = QCompleter(completion_model, combo)
+    completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+    combo.setCompleter(completer)
+    combo.setModel(NameListModel(conn, table, parent=combo))
+
+    def update_completions(text):
+        completion_model.set_prefix(text)
+        if completion_model.rowCount():
+            completer.complete()
+    combo.lineEdit().textEdited.connect(update_completions)
+    return combo
@@ -0,0 +1,15 @@
+# names.py
+"""Нормализация имён для сравнения без учёта регистра.
+
+Встроенные NOCASE и LOWER в SQLite приводят к нижнему регистру только
+латиницу, поэтому ключ сравнения считается в Python и хранится в
+столбце norm_name с уникальным индексом (см. migrations.py).
+"""
+import re
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name):
+    """Ключ имени: casefold, ё заменена на е, пробелы схлопнуты и обрезаны"""
+    return _SPACES.sub(" ", name.casefold().replace("ё", "е")).strip()
@@ -0,0 +1,218 @@
+import database
+
+
+class PagedSource:
+    """Постраничный источник данных одной категории.
+
+    В памяти хранится только буфер строк вокруг текущей позиции. Соседние
+    страницы подгружаются по ключу (keyset-пагинация по id), поэтому
+    переход на один блок вперёд или назад стоит одного короткого запроса.
+    """
+
+    def __init__(self, conn, table, factory, page_size=5, prefetch=10, batch=False):
+        self.conn = conn
+        self.table = table
+        self.factory = factory
+        self.batch = batch  # factory принимает сразу весь список строк страницы
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self._count = None
+        self._start = 0  # абсолютный индекс первой строки буфера
+        self._keys = []
+        self._items = []
+        self._anchor = None  # ключ первой строки буфера до invalidate
+
+    def __len__(self):
+        if self._count is None:
+            self._count = database.count_rows(self.conn, self.table)
+        return self._count
+
+    def __iter__(self):
+        """Потоковый обход всей категории без загрузки её целиком"""
+        after = None
+        while True:
+            rows = database.get_page(self.conn, self.table, after=after, limit=500)
+            if not rows:
+                return
+            yield from self._build(rows)
+            after = rows[-1][0]
+
+    def window(self, index, size=None):
+        """Элементы с позиции index (не больше size штук)"""
+        size = size or self.page_size
+        end = min(index + size, len(self))
+        if index < 0 or index >= end:
+            return []
+        self._ensure(index, end)
+        return self._items[index - self._start:end - self._start]
+
+    def invalidate(self):
+        """Сброс буфера и счётчика после изменения таблицы.
+
+        Позиция буфера запоминается ключом его первой строки: окно на той же
+        позиции перечитывается по ключу, а не через OFFSET от начала таблицы
+        (в глубине большой категории это сотни миллисекунд).
+        """
+        self._count = None
+        self._anchor = self._keys[0] if self._keys else None
+        if self._anchor is None:
+            self._start = 0
+        self._keys = []
+        self._items = []
+
+    def _build(self, rows):
+        if self.batch:
+            return self.factory([row[1:] for row in rows])
+        return [self.factory(row[1:]) for row in rows]
+
+    def _ensure(self, start, end):
+        buffer_end = self._start + len(self._items)
+        if self._items and self._start <= start and end <= buffer_end:
+            return
+
+        if self._items and self._start <= start <= buffer_end:
+            # Продолжение вперёд от последнего ключа
+            rows = database.get_page(self.conn, self.table, after=self._keys[-1],
+                                     limit=end - buffer_end + self.prefetch)
+            self._keys.extend(row[0] for row in rows)
+            self._items.extend(self._build(rows))
+        elif self._items and self._start <= end <= buffer_end:
+            # Продолжение назад от первого ключа
+            limit = min(self._start, self._start - start + self.prefetch)
+            rows = database.get_page(self.conn, self.table, before=self._keys[0], limit=limit)
+            self._keys[:0] = [row[0] for row in rows]
+            self._items[:0] = self._build(rows)
+            self._start -= len(rows)
+        elif self._anchor is not None and self._start <= start:
+            # Перечитывание после invalidate от прежней первой строки (ключи - id)
+            rows = database.get_page(self.conn, self.table, after=self._anchor - 1,
+                                     limit=end - self._start + self.prefetch)
+            self._keys = [row[0] for row in rows]
+            self._items = self._build(rows)
+        else:
+            # Переход без опорного ключа: загружаем окно заново
+            offset = max(0, start - self.prefetch)
+            rows = database.get_page_at(self.conn, self.table, offset,
+                                        limit=end - offset + self.prefetch)
+            self._start = offset
+            self._keys = [row[0] for row in rows]
+            self._items = self._build(rows)
+
+        self._anchor = None
+        self._trim(start, end)
+
+    def _trim(self, start, end):
+        """Ограничение буфера окном и запасом предзагрузки с обеих сторон"""
+        keep_from = max(self._start, start - self.prefetch)
+        keep_to = end + self.prefetch
+        lo = keep_from - self._start
+        hi = keep_to - self._start
+        if lo > 0 or hi < len(self._items):
+            self._keys = self._keys[lo:hi]
+            self._items = self._items[lo:hi]
+            self._start = keep_from
+
+
+class SearchSource(PagedSource):
+    """Результаты полнотекстового поиска книг с тем же интерфейсом, что у PagedSource.
+
+    Поиск по общему слову на большом каталоге занимает десятки и сотни
+    миллисекунд, поэтому окна читаются в фоне: submit - DataWorker.submit,
+    on_loaded() вызывается в потоке интерфейса, когда пришла новая порция.
+    Пока нужного окна нет в буфере, window() возвращает то, что уже есть
+    (после invalidate - прежние строки), и ставит чтение в очередь; за
+    краем буфера следующий блок запрашивается заранее.
+
+    Порядок задаётся релевантностью, а не id, поэтому окна подгружаются
+    по смещению. Число совпадений берётся из того же запроса, что и окно,
+    и не превышает SEARCH_RANK_LIMIT + 1; при большем числе more равно
+    True, а длина растёт по мере прокрутки к концу известных строк.
+    """
+
+    # Обход целиком не поддерживается: строки приходят только порциями в фоне
+    __iter__ = None
+
+    def __init__(self, submit, query, factory, on_loaded, on_error=None,
+                 page_size=5, prefetch=10):
+        super().__init__(None, "books", factory, page_size, prefetch)
+        self.submit = submit
+        self.query = query
+        self.on_loaded = on_loaded
+        self.on_error = on_error
+        self.more = False
+        self.loading = False
+        self._stale = False
+        self._generation = 0  # ответы на запросы до invalidate отбрасываются
+        self._request(0, page_size)
+
+    @property
+    def loaded(self):
+        """Пришла ли первая порция (известно ли число совпадений)"""
+        return self._count is not None
+
+    def __len__(self):
+        return self._count or 0
+
+    def window(self, index, size=None):
+        size = size or self.page_size
+        end = min(index + size, len(self))
+        if index < 0 or index >= end:
+            return []
+        buffer_end = self._start + len(self._items)
+        covered = bool(self._items) and self._start <= index and end <= buffer_end
+        # Следующий и предыдущий блоки должны быть в буфере до перехода на них
+        ahead = end + self.page_size > buffer_end and (buffer_end < self._count or self.more)
+        behind = index - self.page_size < self._start and self._start > 0
+        if self._stale or not covered or ahead or behind:
+            self._request(index, end)
+        if not covered:
+            return []
+        return self._items[index - self._start:end - self._start]
+
+    def invalidate(self):
+        """Перечитать результаты; до ответа видны прежние строки"""
+        self._generation += 1
+        self._stale = True
+        self.loading = False
+
+    def _request(self, start, end):
+        if self.loading:
+            return
+        self.loading = True
+        offset = max(0, start - self.prefetch)
+        limit = end - offset + self.prefetch
+        generation = self._generation
+        self.submit(database.search_books, self.query, limit, offset,
+                    on_result=lambda result: self._loaded(generation, offset, limit, result),
+                    on_error=lambda error: self._failed(generation, error))
+
+    def _loaded(self, generation, offset, limit, result):
+        if generation != self._generation:
+            return
+        self.loading = False
+        self._stale = False
+        total, rows = result
+        self._start = offset
+        self._keys = [row[0] for row in rows]
+        self._items = self._build(rows)
+        self._update_count(total, offset, len(rows), limit)
+        self.on_loaded()
+
+    def _failed(self, generation, error):
+        if generation != self._generation:
+            return
+        self.loading = False
+        self._stale = False
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _update_count(self, total, offset, fetched, limit):
+        """Длина по ограниченному счёту total и строкам окна с позиции offset"""
+        if total <= database.SEARCH_RANK_LIMIT:
+            self._count, self.more = total, False
+        elif fetched < limit and (fetched or not offset):
+            # Окно дошло до последнего совпадения: число известно точно
+            self._count, self.more = offset + fetched, False
+        else:
+            self._count = max(self._count or 0, total, offset + fetched)
+            self.more = True
@@ -0,0 +1,101 @@
+# styles.py
+"""Таблицы стилей интерфейса.
+
+Все правила собраны в одну таблицу MAIN_WINDOW, которая устанавливается
+один раз на главное окно. Диалоги создаются дочерними окнами и наследуют
+её, поэтому Qt разбирает стили один раз за запуск, а не при каждом
+открытии диалога. Отдельные виджеты выбираются по objectName (константы
+ниже) вместо собственных setStyleSheet.
+"""
+
+NAV_FRAME = "navFrame"
+NAV_ARROW = "navArrow"
+DIALOG_TITLE = "dialogTitle"
+ARROW_COMBO = "arrowCombo"
+
+MAIN_WINDOW = f"""
+    QMainWindow {{
+        background-color: white;
+    }}
+    QGroupBox {{
+        background-color: white;
+        border: 2px solid #4CAF50;
+        border-radius: 5px;
+        margin-top: 10px;
+        padding-top: 15px;
+    }}
+    QGroupBox::title {{
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 3px;
+        color: #333;
+        font-weight: bold;
+        font-size: 14px;
+    }}
+    QPushButton {{
+        background-color: #4CAF50;
+        border: none;
+        color: white;
+        padding: 8px 16px;
+        text-align: center;
+        font-size: 14px;
+        margin: 4px 2px;
+        border-radius: 4px;
+    }}
+    QPushButton:hover {{
+        background-color: #45a049;
+    }}
+    QLabel {{
+        font-size: 14px;
+        margin: 6px;
+        color: #333;
+    }}
+    QListView {{
+        background-color: white;
+        border: 1px solid #a0c0a0;
+        border-radius: 4px;
+        font-size: 14px;
+    }}
+    QLineEdit, QComboBox {{
+        padding: 6px;
+        font-size: 14px;
+        border: 1px solid #a0c0a0;
+        border-radius: 4px;
+        background-color: white;
+    }}
+
+    /* Верхняя панель навигации: зелёный фон и тёмно-багровые кнопки */
+    QFrame#{NAV_FRAME} {{
+        background-color: green;
+    }}
+    #{NAV_FRAME} QPushButton {{
+        background-color: #4B0000;
+        color: white;
+        border-radius: 6px;
+    }}
+    QPushButton#{NAV_ARROW} {{
+        padding: 10px;
+    }}
+
+    QLabel#{DIALOG_TITLE} {{
+        font-size: 16px;
+        font-weight: bold;
+    }}
+
+    /* Выпадающие списки диалогов с зелёной стрелкой */
+    QComboBox#{ARROW_COMBO}::drop-down {{
+        subcontrol-origin: padding;
+        subcontrol-position: top right;
+        width: 20px;
+        border-left-width: 1px;
+        border-left-color: darkgray;
+        border-left-style: solid;
+        border-top-right-radius: 3px;
+        border-bottom-right-radius: 3px;
+    }}
+    QComboBox#{ARROW_COMBO}::down-arrow {{
+        image: url(icons/green_down_arrow.png);
+        width: 18px;
+        height: 18px;
+    }}
+"""
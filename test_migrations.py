@@ -0,0 +1,36 @@
+# test_migrations.py
+"""Проверка планов частых запросов на свежей схеме.
+
+Запуск: python -m unittest test_migrations
+"""
+import os
+import tempfile
+import unittest
+
+import connection
+import migrations
+
+
+class HotQueryPlanTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.conn = connection.connect(self.path)
+
+    def tearDown(self):
+        self.conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_migrate_reaches_latest_version(self):
+        self.assertEqual(migrations.migrate(self.conn), migrations.LATEST_VERSION)
+        self.assertEqual(migrations.get_version(self.conn), migrations.LATEST_VERSION)
+
+    def test_hot_queries_use_indexes(self):
+        migrations.migrate(self.conn)
+        self.assertEqual(migrations.find_full_scans(self.conn), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
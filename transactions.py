@@ -0,0 +1,60 @@
+# transactions.py
+"""Группировка нескольких записей в одну транзакцию (unit of work).
+
+    with transaction(conn):
+        database.add_author(conn, ...)
+        database.add_book(conn, ...)
+
+Внутри блока вспомогательные функции database.py не фиксируют изменения
+сами: всё фиксируется одним COMMIT на выходе из внешнего блока или
+откатывается целиком при исключении. Вложенный блок работает как
+SAVEPOINT и при ошибке откатывает только свою часть.
+"""
+from contextlib import contextmanager
+
+_depth = {}  # id(conn) -> глубина вложенности открытых блоков
+
+
+def in_transaction(conn):
+    """Открыт ли для соединения внешний блок transaction()"""
+    return id(conn) in _depth
+
+
+def commit(conn):
+    """Фиксация изменений, если соединение не участвует во внешней транзакции"""
+    if not in_transaction(conn):
+        conn.commit()
+
+
+@contextmanager
+def transaction(conn, immediate=False):
+    """immediate=True берёт блокировку записи сразу (BEGIN IMMEDIATE), а не
+    при первой записи; для вложенного блока не действует"""
+    key = id(conn)
+    depth = _depth.get(key, 0)
+    savepoint = f"uow_{depth}"
+    if depth == 0:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    else:
+        conn.execute(f"SAVEPOINT {savepoint}")
+    _depth[key] = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+        else:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+        raise
+    else:
+        if depth == 0:
+            conn.commit()
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+    finally:
+        if depth == 0:
+            del _depth[key]
+        else:
+            _depth[key] = depth
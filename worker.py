@@ -0,0 +1,88 @@
+# worker.py
+"""Фоновое выполнение запросов к базе для интерфейса.
+
+DataWorker запускает задачи в QThreadPool. Каждая задача получает
+соединение из ConnectionPool (connection.py): читающие задачи - одно из
+соединений только для чтения и выполняются параллельно, пишущие -
+единственное пишущее соединение в отдельном пуле из одного потока, поэтому
+записи выполняются строго в порядке отправки. Результат или исключение
+возвращаются сигналом и обрабатываются уже в потоке интерфейса.
+
+Задача - обычная функция func(conn, *args); объекты каталога и виджеты
+в ней трогать нельзя, с ними работают только обработчики результата.
+"""
+from PyQt5.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from connection import ConnectionPool
+from logger import logger
+
+
+class _TaskSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class _Task(QRunnable):
+    def __init__(self, pool, func, args, write):
+        super().__init__()
+        self.pool = pool
+        self.func = func
+        self.args = args
+        self.write = write
+        self.signals = _TaskSignals()
+        # Задачу держит DataWorker до доставки результата
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            with (self.pool.writer() if self.write else self.pool.reader()) as conn:
+                result = self.func(conn, *self.args)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+
+class DataWorker(QObject):
+    """Очередь задач к базе с отдельными соединениями в фоновых потоках"""
+
+    def __init__(self, path, max_threads=2, parent=None):
+        super().__init__(parent)
+        self.pool = ConnectionPool(path, max_readers=max_threads)
+        self.threads = QThreadPool(self)
+        self.threads.setMaxThreadCount(max_threads)
+        self.write_thread = QThreadPool(self)
+        self.write_thread.setMaxThreadCount(1)
+        self._pending = set()
+
+    def submit(self, func, *args, on_result=None, on_error=None, write=False):
+        """Запуск func(conn, *args) в фоне.
+
+        on_result(результат) и on_error(исключение) вызываются в потоке
+        интерфейса. Без on_error исключение записывается в журнал.
+        """
+        task = _Task(self.pool, func, args, write)
+        self._pending.add(task)
+        task.signals.finished.connect(lambda result: self._done(task, on_result, result))
+        task.signals.failed.connect(lambda error: self._done(task, on_error, error, failed=True))
+        (self.write_thread if write else self.threads).start(task)
+        return task
+
+    def _done(self, task, callback, value, failed=False):
+        self._pending.discard(task)
+        if callback is not None:
+            callback(value)
+        elif failed:
+            logger.log_error("Ошибка фоновой задачи %s: %s", task.func.__name__, value)
+
+    def wait_for_done(self):
+        """Ожидание всех задач и доставка их результатов (для скриптов и замеров)"""
+        while self._pending:
+            self.write_thread.waitForDone()
+            self.threads.waitForDone()
+            QCoreApplication.processEvents()
+
+    def close(self):
+        self.write_thread.waitForDone()
+        self.threads.waitForDone()
+        self.pool.close()